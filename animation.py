@@ -0,0 +1,594 @@
+"""
+Animation Module
+
+This module provides streaming GIF and APNG writers for tree growth animations. Frames are
+written one at a time as the tree grows, mapped straight onto the tree's palette (no
+quantization), and only the rectangle that changed since the previous frame is stored.
+"""
+
+from __future__ import annotations
+
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
+
+
+Palette = Dict[str, Tuple[int, int, int, int]]
+
+PALETTE_KEYS = [
+    "leaves0",
+    "leaves1",
+    "leaves2",
+    "leaves_outline",
+    "trunk0",
+    "trunk1",
+    "trunk_outline",
+    "shadow_color",
+]
+
+
+def blend(color: Tuple[int, ...], background: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    """
+    Blend a (possibly translucent) color over an opaque background color, rounding the same
+    way Pygame's alpha blitter does.
+
+    Args:
+        color (Tuple[int, ...]): An RGB or RGBA color.
+        background (Tuple[int, int, int]): The opaque background color.
+
+    Returns:
+        Tuple[int, int, int]: The resulting opaque RGB color.
+    """
+    alpha = color[3] if len(color) > 3 else 255
+    return tuple(
+        b + (((c - b) * alpha + c) >> 8) for c, b in zip(color[:3], background[:3])
+    )
+
+
+class ColorTable:
+    """
+    Maps RGB pixels onto a fixed table of at most 256 colors.
+
+    Exact matches are looked up directly; any other color snaps to the nearest entry, so
+    frames rendered with the table's palettes are stored losslessly.
+
+    Attributes:
+        colors (List[Tuple[int, int, int]]): The RGB entries of the table.
+    """
+
+    def __init__(self, colors: List[Tuple[int, int, int]]) -> None:
+        """
+        Initialize a new ColorTable instance.
+
+        Args:
+            colors (List[Tuple[int, int, int]]): The RGB colors of the table (duplicates are dropped).
+
+        Raises:
+            ValueError: If the table is empty or has more than 256 colors.
+        """
+        self.colors: List[Tuple[int, int, int]] = []
+        self._lookup: Dict[int, int] = {}
+        for color in colors:
+            key = _pack(color)
+            if key not in self._lookup:
+                self._lookup[key] = len(self.colors)
+                self.colors.append(tuple(color[:3]))
+        if not 0 < len(self.colors) <= 256:
+            raise ValueError(f"A color table needs 1 to 256 colors, got {len(self.colors)}.")
+        self._array = np.array(self.colors, dtype=np.int32)
+
+    @classmethod
+    def from_palette(
+        cls, palette: Union[Palette, Sequence[Palette]], background: Tuple[int, int, int]
+    ) -> "ColorTable":
+        """
+        Build the color table for a tree palette drawn over an opaque background.
+
+        Args:
+            palette (Union[Palette, Sequence[Palette]]): The tree's palette, or every palette
+                the tree was drawn with if it changed colors during the animation.
+            background (Tuple[int, int, int]): The background color behind the tree.
+
+        Returns:
+            ColorTable: A table holding the background and every palette color.
+        """
+        palettes = [palette] if isinstance(palette, dict) else palette
+        colors = [tuple(background[:3])]
+        for colors_by_name in palettes:
+            colors += [blend(colors_by_name[key], background) for key in PALETTE_KEYS if key in colors_by_name]
+        return cls(colors)
+
+    def index(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Convert an RGB frame into color table indices.
+
+        Args:
+            frame (np.ndarray): A (height, width, 3) RGB frame.
+
+        Returns:
+            np.ndarray: A (height, width) array of uint8 indices.
+        """
+        return self.index_packed(pack_frame(frame))
+
+    def index_packed(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Convert a frame of packed RGB colors (see pack_frame) into color table indices.
+
+        Args:
+            keys (np.ndarray): A (height, width) array of packed colors.
+
+        Returns:
+            np.ndarray: A (height, width) array of uint8 indices.
+        """
+        unique, inverse = np.unique(keys, return_inverse=True)
+        lut = np.array([self._index_of(int(key)) for key in unique], dtype=np.uint8)
+        return lut[inverse].reshape(keys.shape)
+
+    def _index_of(self, key: int) -> int:
+        """
+        Find the table index for a packed RGB color, snapping to the nearest entry if needed.
+        """
+        if key not in self._lookup:
+            color = np.array([(key >> 16) & 0xFF, (key >> 8) & 0xFF, key & 0xFF], dtype=np.int32)
+            self._lookup[key] = int(np.argmin(((self._array - color) ** 2).sum(axis=1)))
+        return self._lookup[key]
+
+
+def _pack(color: Tuple[int, ...]) -> int:
+    """
+    Pack an RGB color into a single integer.
+    """
+    return (int(color[0]) << 16) | (int(color[1]) << 8) | int(color[2])
+
+
+def pack_frame(frame: np.ndarray) -> np.ndarray:
+    """
+    Pack every pixel of an RGB frame into a single 0xRRGGBB integer, so frames compare cheaply.
+
+    Args:
+        frame (np.ndarray): A (height, width, 3) RGB frame.
+
+    Returns:
+        np.ndarray: A (height, width) uint32 array of packed colors.
+    """
+    keys = np.left_shift(frame[..., 0], 16, dtype=np.uint32)
+    keys |= np.left_shift(frame[..., 1], 8, dtype=np.uint32)
+    keys |= frame[..., 2]
+    return keys
+
+
+def changed_rect(previous: Optional[np.ndarray], current: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Find the bounding rectangle of the pixels that differ between two frames.
+
+    Args:
+        previous (Optional[np.ndarray]): The previous frame, or None if there is none.
+        current (np.ndarray): The current frame.
+
+    Returns:
+        Optional[Tuple[int, int, int, int]]: The (x, y, width, height) of the change, the whole
+        frame if there is no previous frame, or None if nothing changed.
+    """
+    height, width = current.shape
+    if previous is None:
+        return 0, 0, width, height
+    diff = previous != current
+    rows = np.flatnonzero(diff.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(diff.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1)
+
+
+class AnimationWriter(ABC):
+    """
+    Base class for streaming, palette-indexed animation writers.
+
+    Identical consecutive frames are merged into one longer frame, and every stored frame only
+    covers the rectangle that changed since the frame before it. Only that rectangle is mapped
+    onto the color table, so the per-frame cost follows the size of the change, and pixels in
+    it that did not change are stored as a transparent index so they compress to almost nothing.
+
+    Attributes:
+        size (Tuple[int, int]): The dimensions of the animation (width, height).
+        fps (int): Frames per second of the incoming frames.
+        table (ColorTable): The color table frames are mapped onto.
+        transparent (int): The index used for unchanged pixels (one past the table).
+        frame_count (int): The number of frames stored so far.
+    """
+
+    # Shortest duration (in seconds) a stored frame may have; shorter frames are merged.
+    min_frame_time = 0.0
+
+    def __init__(
+        self,
+        file: Union[str, BinaryIO],
+        size: Tuple[int, int],
+        palette: Union[Palette, Sequence[Palette]],
+        background: Tuple[int, int, int],
+        fps: int = 30,
+    ) -> None:
+        """
+        Initialize a new AnimationWriter instance.
+
+        Args:
+            file (Union[str, BinaryIO]): The output filename or a writable binary file object.
+            size (Tuple[int, int]): The dimensions of the animation (width, height).
+            palette (Union[Palette, Sequence[Palette]]): The palette the frames are drawn with,
+                or a sequence of palettes if they were drawn with several.
+            background (Tuple[int, int, int]): The background color behind the tree.
+            fps (int): Frames per second of the incoming frames.
+
+        Raises:
+            ValueError: If the palettes leave no free index for transparency.
+        """
+        self.table = ColorTable.from_palette(palette, background)
+        if len(self.table.colors) == 256:
+            raise ValueError("The color table needs a free entry for transparency.")
+        self.transparent = len(self.table.colors)
+        self._owns_file = isinstance(file, str)
+        self.file: BinaryIO = open(file, "wb") if self._owns_file else file
+        self.size = size
+        self.fps = fps
+        self.frame_count = 0
+        self._shown: Optional[np.ndarray] = None
+        self._pending: Optional[np.ndarray] = None
+        self._pending_frames = 0
+        self._elapsed_frames = 0
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+        Add an RGB frame to the animation.
+
+        Args:
+            frame (np.ndarray): A (height, width, 3) RGB frame.
+        """
+        self._push(pack_frame(frame))
+
+    def write_surface(self, surface: pygame.Surface) -> None:
+        """
+        Add an opaque Pygame surface to the animation.
+
+        32-bit XRGB surfaces (the usual Pygame layout) are read through a pixel view, so the
+        frame is never copied out as an RGB array.
+
+        Args:
+            surface (pygame.Surface): The frame to add.
+        """
+        if surface.get_bytesize() == 4 and surface.get_shifts()[:3] == (16, 8, 0):
+            self._push(np.bitwise_and(pygame.surfarray.pixels2d(surface), 0xFFFFFF).T)
+        else:
+            self.write(pygame.surfarray.array3d(surface).transpose(1, 0, 2))
+
+    def _push(self, keys: np.ndarray) -> None:
+        """
+        Queue a frame of packed colors, merging it with the pending frame when possible.
+        """
+        if self._pending is not None:
+            if np.array_equal(keys, self._pending):
+                self._pending_frames += 1
+                return
+            if self._pending_frames / self.fps >= self.min_frame_time:
+                self._flush()
+        self._pending = keys
+        self._pending_frames += 1
+
+    def close(self) -> None:
+        """
+        Write any pending frame, finish the file and close it if it was opened by the writer.
+        """
+        if self._pending is not None:
+            self._flush()
+        self._finish()
+        if self._owns_file:
+            self.file.close()
+
+    def __enter__(self) -> "AnimationWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _flush(self) -> None:
+        """
+        Store the pending frame as the changed rectangle against the last stored frame.
+        """
+        rect = changed_rect(self._shown, self._pending)
+        if rect is not None:
+            x, y, width, height = rect
+            current = self._pending[y:y + height, x:x + width]
+            indices = self.table.index_packed(current)
+            if self._shown is not None:
+                unchanged = self._shown[y:y + height, x:x + width] == current
+                indices[unchanged] = self.transparent
+            self._emit(rect, indices, self._pending_frames)
+            self.frame_count += 1
+        else:
+            self._extend(self._pending_frames)
+        self._elapsed_frames += self._pending_frames
+        self._shown = self._pending
+        self._pending = None
+        self._pending_frames = 0
+
+    @abstractmethod
+    def _emit(self, rect: Tuple[int, int, int, int], indices: np.ndarray, frames: int) -> None:
+        """
+        Store one frame.
+
+        Args:
+            rect (Tuple[int, int, int, int]): The (x, y, width, height) the frame covers.
+            indices (np.ndarray): The color table indices inside the rectangle.
+            frames (int): How many incoming frames this frame lasts.
+        """
+
+    @abstractmethod
+    def _extend(self, frames: int) -> None:
+        """
+        Lengthen the last stored frame by a number of incoming frames.
+        """
+
+    @abstractmethod
+    def _finish(self) -> None:
+        """
+        Write whatever the format needs after the last frame.
+        """
+
+
+class GifWriter(AnimationWriter):
+    """
+    Streams an animated GIF using the tree's palette as the global color table.
+    """
+
+    # Browsers slow down GIF frames shorter than 2/100 s, so shorter frames are merged.
+    min_frame_time = 0.02
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        width, height = self.size
+        self._code_size = max(2, self.transparent.bit_length())
+        table_bits = self._code_size - 1
+        colors = self.table.colors + [(0, 0, 0)] * ((2 << table_bits) - len(self.table.colors))
+        self.file.write(b"GIF89a")
+        self.file.write(struct.pack("<HHBBB", width, height, 0xF0 | table_bits, 0, 0))
+        self.file.write(bytes(channel for color in colors for channel in color))
+        # NETSCAPE2.0 extension: loop forever
+        self.file.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+
+    def _delay(self, frames: int) -> int:
+        """
+        Convert a frame count into a GIF delay in hundredths of a second, without drift.
+        """
+        start = round(self._elapsed_frames * 100 / self.fps)
+        return round((self._elapsed_frames + frames) * 100 / self.fps) - start
+
+    def _emit(self, rect: Tuple[int, int, int, int], indices: np.ndarray, frames: int) -> None:
+        x, y, width, height = rect
+        delay = self._delay(frames)
+        # Graphic control extension: keep the previous frame, mark the transparent index
+        self.file.write(struct.pack("<BBBBHBB", 0x21, 0xF9, 4, 0x05, delay, self.transparent, 0))
+        self.file.write(struct.pack("<BHHHHB", 0x2C, x, y, width, height, 0))
+        self.file.write(bytes([self._code_size]))
+        data = lzw_encode(indices.tobytes(), self._code_size)
+        for i in range(0, len(data), 255):
+            block = data[i:i + 255]
+            self.file.write(bytes([len(block)]) + block)
+        self.file.write(b"\x00")
+
+    def _extend(self, frames: int) -> None:
+        # A transparent 1x1 frame keeps the picture and adds the delay.
+        self._emit((0, 0, 1, 1), np.full((1, 1), self.transparent, dtype=np.uint8), frames)
+
+    def _finish(self) -> None:
+        self.file.write(b"\x3b")
+
+
+class ApngWriter(AnimationWriter):
+    """
+    Streams an indexed-color animated PNG. The output must be seekable, since the frame count
+    in the header is only known once the animation is closed.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        width, height = self.size
+        self._sequence = 0
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+        self._actl_offset = self.file.tell()
+        self._chunk(b"acTL", struct.pack(">II", 0, 0))
+        colors = self.table.colors + [(0, 0, 0)]
+        self._chunk(b"PLTE", bytes(channel for color in colors for channel in color))
+        self._chunk(b"tRNS", bytes([255] * len(self.table.colors) + [0]))
+        self._last_fctl: Optional[Tuple[int, Tuple[int, int, int, int], int]] = None
+
+    def _chunk(self, kind: bytes, data: bytes) -> None:
+        """
+        Write a single PNG chunk.
+        """
+        self.file.write(struct.pack(">I", len(data)) + kind + data)
+        self.file.write(struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    def _fctl(self, sequence: int, rect: Tuple[int, int, int, int], frames: int) -> bytes:
+        """
+        Build the data of a frame control chunk.
+        """
+        x, y, width, height = rect
+        # Later frames are blended over the previous one so transparent pixels keep it
+        blend_op = 0 if sequence == 0 else 1
+        return struct.pack(">IIIIIHHBB", sequence, width, height, x, y, frames, self.fps, 0, blend_op)
+
+    def _emit(self, rect: Tuple[int, int, int, int], indices: np.ndarray, frames: int) -> None:
+        rows = np.zeros((indices.shape[0], indices.shape[1] + 1), dtype=np.uint8)
+        rows[:, 1:] = indices  # Filter type 0 (None) for every scanline
+        data = zlib.compress(rows.tobytes())
+
+        self._last_fctl = (self.file.tell(), rect, self._sequence)
+        self._chunk(b"fcTL", self._fctl(self._sequence, rect, frames))
+        self._sequence += 1
+        if self.frame_count == 0:
+            self._chunk(b"IDAT", data)
+        else:
+            self._chunk(b"fdAT", struct.pack(">I", self._sequence) + data)
+            self._sequence += 1
+        self._last_frames = frames
+
+    def _extend(self, frames: int) -> None:
+        # Rewrite the previous frame's control chunk in place with the longer delay.
+        offset, rect, sequence = self._last_fctl
+        end = self.file.tell()
+        self._last_frames += frames
+        self.file.seek(offset)
+        self._chunk(b"fcTL", self._fctl(sequence, rect, self._last_frames))
+        self.file.seek(end)
+
+    def _finish(self) -> None:
+        self._chunk(b"IEND", b"")
+        end = self.file.tell()
+        self.file.seek(self._actl_offset)
+        self._chunk(b"acTL", struct.pack(">II", self.frame_count, 0))
+        self.file.seek(end)
+
+
+def lzw_encode(data: bytes, min_code_size: int) -> bytes:
+    """
+    Compress data with the variable-length LZW coding used by GIF.
+
+    Runs of a single index (transparent areas, pixellated blocks) are skipped over in one step
+    where the code table already holds a long enough run, which gives the same output as the
+    byte-by-byte algorithm at a fraction of the cost.
+
+    Args:
+        data (bytes): The color indices to compress.
+        min_code_size (int): The minimum code size (bits per color index).
+
+    Returns:
+        bytes: The packed LZW code stream.
+    """
+    clear_code = 1 << min_code_size
+    end_code = clear_code + 1
+    output = bytearray()
+    append = output.append
+    bit_buffer = clear_code
+    bit_count = code_size = min_code_size + 1
+    next_code = end_code + 1
+    table: Dict[int, int] = {}
+    lookup = table.get
+    # runs[c][k - 1] is the code for index c repeated k times; run_of maps codes back to (c, k)
+    runs = [[c] for c in range(clear_code)]
+    run_of = {c: (c, 1) for c in range(clear_code)}
+
+    values = np.frombuffer(data, dtype=np.uint8)
+    starts = np.flatnonzero(np.diff(values)) + 1
+    bounds = np.concatenate(([0], starts, [values.size])).tolist() if values.size else [0]
+    prefix = -1
+    for run_start, run_end in zip(bounds[:-1], bounds[1:]):
+        byte = data[run_start]
+        remaining = run_end - run_start
+        if prefix < 0:
+            prefix = byte
+            remaining -= 1
+        while remaining:
+            run = run_of.get(prefix)
+            if run is not None and run[0] == byte and run[1] < len(runs[byte]):
+                step = min(remaining, len(runs[byte]) - run[1])
+                prefix = runs[byte][run[1] + step - 1]
+                remaining -= step
+                continue
+            remaining -= 1
+            key = (prefix << 8) | byte
+            code = lookup(key)
+            if code is not None:
+                prefix = code
+                continue
+            bit_buffer |= prefix << bit_count
+            bit_count += code_size
+            while bit_count >= 8:
+                append(bit_buffer & 0xFF)
+                bit_buffer >>= 8
+                bit_count -= 8
+            if next_code == 4096:
+                bit_buffer |= clear_code << bit_count
+                bit_count += code_size
+                table.clear()
+                runs = [[c] for c in range(clear_code)]
+                run_of = {c: (c, 1) for c in range(clear_code)}
+                code_size = min_code_size + 1
+                next_code = end_code + 1
+            else:
+                table[key] = next_code
+                if run is not None and run[0] == byte:
+                    runs[byte].append(next_code)
+                    run_of[next_code] = (byte, run[1] + 1)
+                if next_code == 1 << code_size:
+                    code_size += 1
+                next_code += 1
+            prefix = byte
+    if prefix >= 0:
+        bit_buffer |= prefix << bit_count
+        bit_count += code_size
+    bit_buffer |= end_code << bit_count
+    bit_count += code_size
+    while bit_count > 0:
+        append(bit_buffer & 0xFF)
+        bit_buffer >>= 8
+        bit_count -= 8
+    return bytes(output)
+
+
+def open_writer(
+    filename: str,
+    size: Tuple[int, int],
+    palette: Union[Palette, Sequence[Palette]],
+    background: Tuple[int, int, int],
+    fps: int = 30,
+) -> AnimationWriter:
+    """
+    Open an animation writer for a filename, choosing the format from its extension.
+
+    Args:
+        filename (str): The output filename (".gif", ".apng" or ".png").
+        size (Tuple[int, int]): The dimensions of the animation (width, height).
+        palette (Union[Palette, Sequence[Palette]]): The palette the frames are drawn with,
+            or a sequence of palettes if they were drawn with several.
+        background (Tuple[int, int, int]): The background color behind the tree.
+        fps (int): Frames per second of the incoming frames.
+
+    Returns:
+        AnimationWriter: A GIF or APNG writer.
+
+    Raises:
+        ValueError: If the extension is not supported.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension == "gif":
+        return GifWriter(filename, size, palette, background, fps)
+    if extension in ("apng", "png"):
+        return ApngWriter(filename, size, palette, background, fps)
+    raise ValueError(f"Unsupported animation format '.{extension}'.")
+
+
+def record_growth(tree, writer: AnimationWriter, background: Tuple[int, int, int]) -> int:
+    """
+    Grow a tree to completion, streaming every frame to an animation writer.
+
+    Args:
+        tree (Tree): The tree to grow.
+        writer (AnimationWriter): The writer receiving the frames.
+        background (Tuple[int, int, int]): The background color behind the tree.
+
+    Returns:
+        int: The number of frames written.
+    """
+    frame = pygame.Surface(tree.rect.size)
+    frames = 0
+    while tree.grow():
+        frame.fill(background)
+        frame.blit(tree.surface, (0, 0))
+        writer.write_surface(frame)
+        frames += 1
+    return frames
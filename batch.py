@@ -0,0 +1,296 @@
+"""
+Batch Module
+
+This module renders many trees at once. Each tree still draws its own raw branch and leaf
+layers, but the post-processing chain (pixelation, outlines and the shadow) runs once over
+the whole batch as stacked NumPy arrays instead of as a dozen Pygame calls per tree. The
+results are pixel-identical to Tree.render().
+
+Every step of the chain is a nearest-neighbour resample, a mask operation or an alpha blit,
+so it is reproduced exactly: the downsampling is done by picking the pixels Pygame would
+pick while reading the layers, and everything after that works at the low resolution until
+the finished trees are written back.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import constants as cts
+from lazy import lazy_import
+from tree import Tree
+
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
+
+ARGB_SHIFTS = (16, 8, 0, 24)  # The pixel layout of SRCALPHA surfaces that batching supports
+
+
+def scale_indices(source: int, target: int) -> np.ndarray:
+    """
+    Get the source index of every target pixel when pygame.transform.scale resizes one axis.
+
+    Args:
+        source (int): The source length.
+        target (int): The target length.
+
+    Returns:
+        np.ndarray: target indices into the source axis.
+    """
+    return (2 * np.arange(target) + 1) * source // (2 * target)
+
+
+def pack_color(color: Tuple[int, ...]) -> int:
+    """
+    Pack a color as an ARGB pixel value.
+
+    Args:
+        color (Tuple[int, ...]): An RGB or RGBA color.
+
+    Returns:
+        int: The pixel value.
+    """
+    r, g, b, a = pygame.Color(color)
+    return (a << 24) | (r << 16) | (g << 8) | b
+
+
+def blit(source: np.ndarray, dest: np.ndarray) -> np.ndarray:
+    """
+    Alpha blit ARGB pixels onto ARGB pixels, exactly as Pygame blits between SRCALPHA surfaces.
+
+    Opaque and fully transparent source pixels (the common case) are selected directly; only
+    translucent ones go through the blend arithmetic.
+
+    Args:
+        source (np.ndarray): uint32 source pixels.
+        dest (np.ndarray): uint32 destination pixels of the same shape.
+
+    Returns:
+        np.ndarray: The blended pixels.
+    """
+    source_alpha = source >> 24
+    dest_alpha = dest >> 24
+    out = np.where((dest_alpha == 0) | (source_alpha == 255), source, dest)
+    partial = (dest_alpha != 0) & (source_alpha != 0) & (source_alpha != 255)
+    if partial.any():
+        src = source[partial].astype(np.int64)
+        dst = dest[partial].astype(np.int64)
+        alpha = src >> 24
+        dst_alpha = dst >> 24
+        blended = (alpha + dst_alpha - alpha * dst_alpha // 255) << 24
+        for shift in (16, 8, 0):
+            s = (src >> shift) & 255
+            d = (dst >> shift) & 255
+            blended |= ((((s - d) * alpha + s) >> 8) + d) << shift
+        out[partial] = blended.astype(np.uint32)
+    return out
+
+
+def outline(layers: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    """
+    Outline a stack of layers the way tree.outline does: a one pixel, four-neighbour border
+    (never reaching into the last row or column) drawn under each layer.
+
+    Args:
+        layers (np.ndarray): (N, height, width) uint32 ARGB layers.
+        colors (np.ndarray): (N,) uint32 outline colors.
+
+    Returns:
+        np.ndarray: The outlined layers.
+    """
+    mask = (layers >> 24) > 127
+    cropped = mask[:, :-1, :-1]
+    grown = mask.copy()
+    grown[:, :-1, 1:] |= cropped
+    grown[:, 1:, :-1] |= cropped
+    grown[:, :-1, :-2] |= cropped[:, :, 1:]
+    grown[:, :-2, :-1] |= cropped[:, 1:, :]
+    border = np.where(grown, colors[:, None, None], np.uint32(0))
+    return blit(layers, border)
+
+
+def read_layer(surface: pygame.Surface, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """
+    Read only the given rows and columns of a surface.
+
+    Args:
+        surface (pygame.Surface): A 32-bit surface.
+        rows (np.ndarray): The row indices.
+        cols (np.ndarray): The column indices.
+
+    Returns:
+        np.ndarray: (len(rows), len(cols)) uint32 pixel values.
+    """
+    view = pygame.surfarray.pixels2d(surface)  # (width, height), locks the surface
+    try:
+        return view[np.ix_(cols, rows)].T
+    finally:
+        del view
+
+
+def post_process(
+    branches: np.ndarray,
+    leaves: np.ndarray,
+    palettes: Sequence[Dict[str, Tuple[int, ...]]],
+    size: Tuple[int, int],
+) -> np.ndarray:
+    """
+    Run the post-processing chain of Tree.update_surfaces over a batch of downsampled layers.
+
+    Args:
+        branches (np.ndarray): (N, height // 4, width // 4) uint32 branch layers, sampled as
+            pygame.transform.scale would.
+        leaves (np.ndarray): The leaf layers, likewise.
+        palettes (Sequence[Dict[str, Tuple[int, ...]]]): The palette of each tree.
+        size (Tuple[int, int]): The (width, height) of the trees' surfaces.
+
+    Returns:
+        np.ndarray: (N, height, width // 4) finished pixels. The trees are pixelated, so every
+            column stands for four identical columns of the full surface.
+    """
+    width, height = size
+    count, small_height, small_width = leaves.shape
+    trunk_outline = np.array([pack_color(p["trunk_outline"]) for p in palettes], dtype=np.uint32)
+    leaves_outline = np.array([pack_color(p["leaves_outline"]) for p in palettes], dtype=np.uint32)
+    shadow_color = np.array([pack_color(p["shadow_color"]) for p in palettes], dtype=np.uint32)
+
+    branches = outline(branches, trunk_outline)
+    leaves = outline(leaves, leaves_outline)
+
+    # Upsampling back to full size, as a row map (the column map is the same for every layer)
+    up_rows = scale_indices(small_height, height)
+    up_cols = scale_indices(small_width, width)
+
+    # The shadow's centroid is taken over the full-size leaf mask: count how many full-size
+    # rows and columns each small one becomes, and the sum of their coordinates
+    leaf_mask = (leaves >> 24) > 127
+    row_count = np.bincount(up_rows, minlength=small_height)
+    row_sum = np.bincount(up_rows, weights=np.arange(height), minlength=small_height)
+    col_count = np.bincount(up_cols, minlength=small_width)
+    area = np.einsum("nij,i,j->n", leaf_mask, row_count, col_count)
+    moment = np.einsum("nij,i,j->n", leaf_mask, row_sum, col_count)
+    centroid_y = np.where(area > 0, moment // np.maximum(area, 1), 0).astype(np.int64)
+
+    # The shadow is squashed vertically, then pixelated: compose those resamples into a
+    # single lookup into the small leaf mask
+    shadow_height = int(height // cts.leaves_shadow_ratio)
+    squash = scale_indices(height, shadow_height)
+    shadow_rows = up_rows[squash[scale_indices(shadow_height, shadow_height // 4)]]
+    shadow_cols = up_cols[scale_indices(width, width // 4)]
+    shadow_mask = leaf_mask[:, shadow_rows][:, :, shadow_cols]
+    shadow_up_rows = scale_indices(shadow_height // 4, shadow_height)
+
+    # Shadow first (onto the transparent surface it is a plain copy), then branches, then leaves
+    composite = np.zeros((count, height, small_width), dtype=np.uint32)
+    for n in range(count):
+        top = int(cts.shadow_base - (int(centroid_y[n]) // cts.leaves_shadow_ratio))
+        start, stop = max(top, 0), min(top + shadow_height, height)
+        if start < stop:
+            rows = shadow_mask[n, shadow_up_rows[start - top:stop - top]]
+            composite[n, start:stop] = np.where(rows, shadow_color[n], np.uint32(0))
+    composite = blit(branches[:, up_rows], composite)
+    return blit(leaves[:, up_rows], composite)
+
+
+def render_trees(trees: Sequence[Tree], batch_size: int = 64) -> List[pygame.Surface]:
+    """
+    Render many trees, post-processing them together. Equivalent to calling render() on
+    each tree: their surfaces are updated and returned.
+
+    Args:
+        trees (Sequence[Tree]): The trees to render. They must all have the same size.
+        batch_size (int): The number of trees post-processed in one go.
+
+    Returns:
+        List[pygame.Surface]: The composite surface of each tree.
+
+    Raises:
+        ValueError: If the trees differ in size.
+    """
+    pending = [tree for tree in trees if tree.dirty]
+    if pending:
+        size = pending[0].rect.size
+        if any(tree.rect.size != size for tree in pending):
+            raise ValueError("Batched trees must all have the same size.")
+        width, height = size
+        rows = scale_indices(height, height // 4)
+        cols = scale_indices(width, width // 4)
+        full_cols = scale_indices(width // 4, width)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            for tree in batch:
+                tree.update_layers()
+            if any(tree.surface.get_shifts() != ARGB_SHIFTS for tree in batch):
+                for tree in batch:  # Unusual pixel layout: render one at a time
+                    tree.update_surfaces()
+                continue
+            branches = np.stack([read_layer(tree.branches, rows, cols) for tree in batch])
+            leaves = np.stack([read_layer(tree.leaves, rows, cols) for tree in batch])
+            finished = post_process(branches, leaves, [tree.palette for tree in batch], size)
+            for tree, pixels in zip(batch, finished):
+                view = pygame.surfarray.pixels2d(tree.surface)
+                view[...] = pixels[:, full_cols].T
+                del view
+                tree.dirty = False
+    return [tree.surface for tree in trees]
+
+
+def render_pngs(
+    trees: Sequence[Tree],
+    background: Optional[Tuple[int, int, int]] = None,
+    batch_size: int = 64,
+) -> List[bytes]:
+    """
+    Render many trees together and encode each one as a PNG.
+
+    Args:
+        trees (Sequence[Tree]): The trees to render.
+        background (Optional[Tuple[int, int, int]]): The background color, or None for
+            transparent images.
+        batch_size (int): The number of trees post-processed in one go.
+
+    Returns:
+        List[bytes]: One PNG per tree.
+    """
+    images = []
+    for surface in render_trees(trees, batch_size):
+        if background is not None:
+            image = pygame.Surface(surface.get_size())
+            image.fill(background)
+            image.blit(surface, (0, 0))
+            surface = image
+        output = io.BytesIO()
+        pygame.image.save(surface, output, "tree.png")
+        images.append(output.getvalue())
+    return images
+
+
+def main() -> None:
+    """
+    Compare batched rendering with rendering trees one at a time.
+    """
+    from palette import load_palette
+
+    parser = argparse.ArgumentParser(description="Benchmark batched tree rendering.")
+    parser.add_argument("--trees", type=int, default=64, help="number of trees")
+    parser.add_argument("--max-nodes", type=int, default=30, help="maximum number of nodes")
+    parser.add_argument("--palette", default="green", help="palette name from palettes.json")
+    args = parser.parse_args()
+
+    palette = load_palette(args.palette)
+    timings = {}
+    for name, render in (("one at a time", lambda trees: [tree.render() for tree in trees]), ("batched", render_trees)):
+        trees = [Tree(palette, args.max_nodes, seed=seed) for seed in range(args.trees)]
+        for tree in trees:
+            tree.simulate()
+        start = time.perf_counter()
+        render(trees)
+        timings[name] = time.perf_counter() - start
+        print(f"{name:<14} {timings[name] * 1000 / args.trees:6.2f} ms per tree")
+    print(f"speedup        {timings['one at a time'] / timings['batched']:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Cache Module
+
+This module provides a content-addressed on-disk cache for rendered trees. Entries are keyed by
+a hash of everything that affects the output (seed, generation parameters, palette, output
+scale and format, and the source of the rendering code), so a repeat build skips every tree
+that has not changed. Writes are atomic and the cache is kept under a size cap by evicting
+the least recently used entries.
+"""
+
+import argparse
+import dataclasses
+import functools
+import hashlib
+import json
+import os
+import tempfile
+from typing import Callable, Dict, Optional, Tuple
+import constants as cts
+from config import DEFAULT_CONFIG, TreeConfig
+
+
+# Modules whose source affects rendered output; editing any of them invalidates the cache.
+CODE_MODULES = ["constants", "config", "leaves", "node", "tree", "animation", "export"]
+EXTENSIONS = {"png": ".png", "gif": ".gif", "apng": ".apng"}
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    """
+    Hash the source of the rendering modules.
+
+    Returns:
+        str: A hex digest that changes whenever the rendering code changes.
+    """
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_MODULES:
+        with open(os.path.join(directory, f"{name}.py"), "rb") as file:
+            digest.update(name.encode() + b"\0" + file.read() + b"\0")
+    return digest.hexdigest()
+
+
+def cache_key(
+    seed: int,
+    palette: Dict[str, Tuple[int, int, int, int]],
+    max_nodes: int,
+    output_format: str = "png",
+    background: Optional[Tuple[int, int, int]] = cts.background_color,
+    config: Optional[TreeConfig] = None,
+    scale: int = 1,
+) -> str:
+    """
+    Compute the cache key of a render.
+
+    Args:
+        seed (int): The tree's random seed.
+        palette (Dict[str, Tuple[int, int, int, int]]): The tree's palette.
+        max_nodes (int): The maximum number of nodes in the tree.
+        output_format (str): "png", "gif" or "apng".
+        background (Optional[Tuple[int, int, int]]): The background color, or None.
+        config (Optional[TreeConfig]): The generation parameters (defaults to DEFAULT_CONFIG).
+        scale (int): Integer upscaling factor of the output.
+
+    Returns:
+        str: A hex digest identifying the render.
+
+    Raises:
+        ValueError: If seed is None: unseeded trees are random, so they cannot be cached.
+    """
+    if seed is None:
+        raise ValueError("Cached renders need a seed.")
+    constants = {
+        name: value for name, value in vars(cts).items()
+        if not name.startswith("_") and isinstance(value, (int, float, list, tuple))
+    }
+    description = {
+        "seed": seed,
+        "palette": {name: list(color) for name, color in palette.items()},
+        "max_nodes": max_nodes,
+        "format": output_format,
+        "background": list(background) if background is not None else None,
+        "config": dataclasses.asdict(config if config is not None else DEFAULT_CONFIG),
+        "constants": constants,
+        "scale": scale,
+        "code": code_version(),
+    }
+    encoded = json.dumps(description, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class RenderCache:
+    """
+    A size-capped, least-recently-used cache of files on disk, addressed by key.
+
+    Entries live at directory/<first two key characters>/<key><extension>. Reading an entry
+    refreshes its modification time, which is what eviction orders by.
+
+    The total size is scanned once and then kept as a running total, so writes only touch the
+    rest of the cache when it goes over max_bytes. Eviction then trims it to a low-water mark
+    (low_water * max_bytes), so the next scan is many writes away. Entries written by other
+    processes are picked up by the next scan.
+
+    Attributes:
+        directory (str): The cache directory.
+        max_bytes (int): The size cap of the cache.
+        low_water (float): The fraction of max_bytes that eviction trims the cache down to.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024, low_water: float = 0.9) -> None:
+        """
+        Initialize a new RenderCache instance, creating the directory if needed.
+
+        Args:
+            directory (str): The cache directory.
+            max_bytes (int): The size cap of the cache.
+            low_water (float): The fraction of max_bytes that eviction trims the cache down to.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._size: Optional[int] = None  # Running total, scanned on first use
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str, extension: str) -> str:
+        """
+        Get the path of an entry.
+
+        Args:
+            key (str): The entry's key.
+            extension (str): The file extension, including the dot.
+
+        Returns:
+            str: The path the entry is (or would be) stored at.
+        """
+        return os.path.join(self.directory, key[:2], key + extension)
+
+    def get(self, key: str, extension: str) -> Optional[bytes]:
+        """
+        Read an entry and mark it as recently used.
+
+        Args:
+            key (str): The entry's key.
+            extension (str): The file extension, including the dot.
+
+        Returns:
+            Optional[bytes]: The entry's contents, or None if it is not cached.
+        """
+        path = self.path(key, extension)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:  # Missing, or evicted by another process meanwhile
+            return None
+        return data
+
+    def put(self, key: str, extension: str, data: bytes) -> str:
+        """
+        Store an entry atomically, then evict old entries if the cache is over its cap.
+
+        Args:
+            key (str): The entry's key.
+            extension (str): The file extension, including the dot.
+            data (bytes): The entry's contents.
+
+        Returns:
+            str: The path the entry was stored at.
+        """
+        path = self.path(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        total = self.size()  # Measured before the new entry exists, so it is counted once
+        # Write to a temporary file next to the entry and rename it into place, so readers
+        # (and other processes) never see a partially written file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._size = total + len(data) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+        return path
+
+    def get_or_create(self, key: str, extension: str, create: Callable[[], bytes]) -> bytes:
+        """
+        Read an entry, creating and storing it first if it is not cached.
+
+        Args:
+            key (str): The entry's key.
+            extension (str): The file extension, including the dot.
+            create (Callable[[], bytes]): Produces the contents on a cache miss.
+
+        Returns:
+            bytes: The entry's contents.
+        """
+        data = self.get(key, extension)
+        if data is None:
+            data = create()
+            self.put(key, extension, data)
+        return data
+
+    def size(self) -> int:
+        """
+        Get the total size of the cached entries, as tracked since the last scan.
+
+        Returns:
+            int: The size in bytes.
+        """
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._entries())
+        return self._size
+
+    def evict(self) -> None:
+        """
+        Scan the cache and, if it is over max_bytes, delete least recently used entries until
+        it fits in the low-water mark.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        if total > self.max_bytes:
+            target = int(self.max_bytes * self.low_water)
+            for _, path, size in entries:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        self._size = total
+
+    def _entries(self):
+        """
+        List the cached entries as (modification time, path, size), skipping temporary files.
+        """
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+
+def render_cached(
+    cache: RenderCache,
+    seed: int,
+    palette: Dict[str, Tuple[int, int, int, int]],
+    max_nodes: int,
+    output_format: str = "png",
+    background: Optional[Tuple[int, int, int]] = cts.background_color,
+    config: Optional[TreeConfig] = None,
+    scale: int = 1,
+) -> bytes:
+    """
+    Render a tree through the cache: a hit skips the growth simulation and rendering entirely.
+
+    Args:
+        cache (RenderCache): The cache to use.
+        seed (int): The tree's random seed.
+        palette (Dict[str, Tuple[int, int, int, int]]): The tree's palette.
+        max_nodes (int): The maximum number of nodes in the tree.
+        output_format (str): "png", "gif" or "apng".
+        background (Optional[Tuple[int, int, int]]): The background color, or None for a
+            transparent PNG.
+        config (Optional[TreeConfig]): The generation parameters.
+        scale (int): Integer upscaling factor of PNG output.
+
+    Returns:
+        bytes: The encoded image.
+
+    Raises:
+        ValueError: If seed is None.
+    """
+    key = cache_key(seed, palette, max_nodes, output_format, background, config, scale)
+
+    def create() -> bytes:
+        from export import render_bytes
+
+        return render_bytes(palette, max_nodes, seed, output_format, background, config, scale=scale)
+
+    return cache.get_or_create(key, EXTENSIONS[output_format], create)
+
+
+def main() -> None:
+    """
+    Build a set of tree images from the command line, reusing cached renders.
+    """
+    from palette import load_palette
+
+    parser = argparse.ArgumentParser(description="Render a batch of trees through the disk cache.")
+    parser.add_argument("output", help="directory to write tree_<seed> files to")
+    parser.add_argument("--seeds", type=int, default=10, help="number of seeds, starting at 0")
+    parser.add_argument("--palette", default="green", help="palette name from palettes.json")
+    parser.add_argument("--max-nodes", type=int, default=50, help="maximum number of nodes")
+    parser.add_argument("--format", default="png", choices=sorted(EXTENSIONS), help="output format")
+    parser.add_argument("--scale", type=int, default=1, help="PNG upscaling factor")
+    parser.add_argument("--cache-dir", default=".tree_cache", help="cache directory")
+    parser.add_argument("--cache-mb", type=int, default=512, help="cache size cap in megabytes")
+    args = parser.parse_args()
+
+    cache = RenderCache(args.cache_dir, args.cache_mb * 1024 * 1024)
+    palette = load_palette(args.palette)
+    os.makedirs(args.output, exist_ok=True)
+    for seed in range(args.seeds):
+        data = render_cached(cache, seed, palette, args.max_nodes, args.format, scale=args.scale)
+        with open(os.path.join(args.output, f"tree_{seed}{EXTENSIONS[args.format]}"), "wb") as file:
+            file.write(data)
+    print(f"Wrote {args.seeds} trees to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
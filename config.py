@@ -0,0 +1,63 @@
+"""
+Config Module
+
+This module defines the TreeConfig class, which holds the generation parameters of a tree so
+that trees with different settings can be grown side by side in one process.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Tuple
+import constants as cts
+
+
+@dataclass(frozen=True)
+class TreeConfig:
+    """
+    The generation parameters of a procedural tree. Defaults come from the constants module.
+
+    Attributes:
+        trunk_width_power (float): Exponent applied to a branch's subtree size to get its width.
+        leaves_density (Tuple[int, ...]): The number of leaves drawn per leaf color layer.
+        children_for_leaves (int): Branches with fewer nodes than this in their subtree get leaves.
+        start_branch_len (int): The length of the trunk.
+        start_branch_angle (int): The angle of the trunk (in degrees).
+        min_length (int): The minimum length of a new branch.
+        max_length (int): The maximum length of a new branch.
+        min_angle_left (int): The minimum angle of a new left branch (in degrees).
+        max_angle_left (int): The maximum angle of a new left branch (in degrees).
+        min_angle_right (int): The minimum angle of a new right branch (in degrees).
+        max_angle_right (int): The maximum angle of a new right branch (in degrees).
+        bend_age_change (int): How much bending a branch changes its age.
+        grow_age_change (int): How much lengthening a branch changes its age.
+        grow_length_change (int): How much a branch lengthens when it grows.
+    """
+
+    trunk_width_power: float = cts.trunk_width_power
+    leaves_density: Tuple[int, ...] = tuple(cts.leaves_density)
+    children_for_leaves: int = cts.children_for_leaves
+    start_branch_len: int = cts.start_branch_len
+    start_branch_angle: int = cts.start_branch_angle
+    min_length: int = cts.min_length
+    max_length: int = cts.max_length
+    min_angle_left: int = cts.min_angle_left
+    max_angle_left: int = cts.max_angle_left
+    min_angle_right: int = cts.min_angle_right
+    max_angle_right: int = cts.max_angle_right
+    bend_age_change: int = cts.bend_age_change
+    grow_age_change: int = cts.grow_age_change
+    grow_length_change: int = cts.grow_length_change
+
+    def replace(self, **changes) -> "TreeConfig":
+        """
+        Create a copy of the config with some parameters changed.
+
+        Args:
+            **changes: The parameters to change and their new values.
+
+        Returns:
+            TreeConfig: The new config.
+        """
+        return replace(self, **changes)
+
+
+DEFAULT_CONFIG = TreeConfig()
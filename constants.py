@@ -9,6 +9,7 @@ tree_surface_width = 400
 tree_surface_height = 600
 tree_base_pos = (tree_surface_width / 2, tree_surface_height - 100)
 shadow_base = tree_base_pos[1] - 30
+background_color = (130, 170, 70)
 
 start_branch_len = 30
 start_branch_angle = 90
@@ -0,0 +1,359 @@
+"""
+Export Module
+
+This module exports growth animations by splitting the work in two: a simulation-only run
+records the cheap per-step node state (ages, lengths and angles), then the expensive per-frame
+rendering is fanned out across a process pool and the finished frames are written in order.
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import constants as cts
+import node as nd
+from config import TreeConfig
+from frames import read_bgr
+from lazy import lazy_import
+from leaves import Leaves
+from tree import Tree
+
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
+
+
+class GrowthRecording:
+    """
+    The per-step state of a growing tree, compact enough to send to worker processes.
+
+    Nodes are numbered in the order they appear. Since growth only ever adds nodes, the tree
+    at any step is made of the first len(state) nodes, linked as described by left and right.
+    Nodes are identified by their leaves, which stay the same when a snapshot copies a node.
+
+    Attributes:
+        palette (Dict[str, Tuple[int, int, int]]): The palette the tree is drawn with.
+        config (TreeConfig): The generation parameters of the tree.
+        left (List[int]): The number of each node's left child, or -1.
+        right (List[int]): The number of each node's right child, or -1.
+        leaves (List[list]): The leaf positions of each node.
+        states (List[np.ndarray]): One (nodes, 3) array of (age, length, angle) per step.
+    """
+
+    def __init__(self, palette: Dict[str, Tuple[int, int, int]], config: TreeConfig) -> None:
+        """
+        Initialize a new, empty GrowthRecording instance.
+
+        Args:
+            palette (Dict[str, Tuple[int, int, int]]): The palette the tree is drawn with.
+            config (TreeConfig): The generation parameters of the tree.
+        """
+        self.palette = palette
+        self.config = config
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.leaves: List[list] = []
+        self.states: List[np.ndarray] = []
+        self._numbers: Dict[int, int] = {}
+        self._nodes: List[nd.Node] = []
+        self._kept: List[Leaves] = []  # Keeps recorded leaves alive so their ids stay unique
+
+    def capture(self, tree: Tree) -> None:
+        """
+        Record the current state of a tree.
+
+        Args:
+            tree (Tree): The tree to record.
+        """
+        self._number(tree.root)
+        stack = [tree.root]
+        while stack:
+            node = stack.pop()
+            number = self._numbers[id(node.leaves)]
+            self._nodes[number] = node
+            for child, links in ((node.left, self.left), (node.right, self.right)):
+                if child is not None:
+                    if links[number] < 0:
+                        links[number] = self._number(child)
+                    stack.append(child)
+        self.states.append(
+            np.array([(node.age, node.length, node.angle) for node in self._nodes], dtype=np.float64)
+        )
+
+    def _number(self, node: nd.Node) -> int:
+        """
+        Get the number of a node, numbering it if it is new.
+        """
+        number = self._numbers.get(id(node.leaves))
+        if number is None:
+            number = self._numbers[id(node.leaves)] = len(self._nodes)
+            self._nodes.append(node)
+            self._kept.append(node.leaves)
+            self.left.append(-1)
+            self.right.append(-1)
+            self.leaves.append(node.leaves.leaves)
+        return number
+
+    def structure(self) -> tuple:
+        """
+        Get everything a worker needs besides the per-step states.
+
+        Returns:
+            tuple: The palette, config, child links and leaf positions.
+        """
+        return self.palette, self.config, self.left, self.right, self.leaves
+
+
+def record_states(tree: Tree) -> GrowthRecording:
+    """
+    Grow a tree to completion without rendering, recording the state after every step.
+
+    Args:
+        tree (Tree): The tree to grow.
+
+    Returns:
+        GrowthRecording: One recorded state per step in which the tree grew.
+    """
+    recording = GrowthRecording(tree.palette, tree.config)
+    while tree.step():
+        recording.capture(tree)
+    return recording
+
+
+class StateRenderer:
+    """
+    Rebuilds a recorded tree at any step and renders it. Nodes and their leaf surfaces are
+    kept between frames, so each frame only pays for the tree's own rendering.
+    """
+
+    def __init__(
+        self,
+        structure: tuple,
+        background: Tuple[int, int, int],
+    ) -> None:
+        """
+        Initialize a new StateRenderer instance.
+
+        Args:
+            structure (tuple): The output of GrowthRecording.structure().
+            background (Tuple[int, int, int]): The background color behind the tree.
+        """
+        palette, config, self.left, self.right, leaves = structure
+        # Seeded so that building the placeholder nodes leaves the global random state alone
+        self.tree = Tree(palette, len(leaves), config, seed=0)
+        self.nodes: List[nd.Node] = []
+        for positions in leaves:
+            node = nd.Node(0, 0, 0, palette, config, self.tree.rng)
+            node.leaves.leaves = positions
+            self.nodes.append(node)
+        self.tree.root = self.nodes[0]
+        self.background = background
+        self.frame = pygame.Surface(self.tree.rect.size)
+
+    def render(self, state: np.ndarray) -> np.ndarray:
+        """
+        Render the tree as it was in a recorded state.
+
+        Args:
+            state (np.ndarray): A (nodes, 3) array of (age, length, angle).
+
+        Returns:
+            np.ndarray: A (height, width, 3) BGR frame, ready for a video writer.
+        """
+        count = len(state)
+        for number, (age, length, angle) in enumerate(state.tolist()):
+            node = self.nodes[number]
+            node.age, node.length, node.angle = age, length, angle
+            left, right = self.left[number], self.right[number]
+            node.left = self.nodes[left] if 0 <= left < count else None
+            node.right = self.nodes[right] if 0 <= right < count else None
+        self.tree.reindex()
+        self.frame.fill(self.background)
+        self.frame.blit(self.tree.render(), (0, 0))
+        return read_bgr(self.frame)
+
+
+_renderer: Optional[StateRenderer] = None
+
+
+def _init_worker(structure: tuple, background: Tuple[int, int, int]) -> None:
+    global _renderer
+    _renderer = StateRenderer(structure, background)
+
+
+def _render_state(state: np.ndarray) -> np.ndarray:
+    return _renderer.render(state)
+
+
+def render_frames(
+    recording: GrowthRecording,
+    background: Tuple[int, int, int],
+    processes: Optional[int] = None,
+) -> Iterator[np.ndarray]:
+    """
+    Render every recorded step across a process pool, yielding the frames in order.
+
+    At most a few frames per worker are in flight at once, so memory stays bounded however
+    long the recording is.
+
+    Args:
+        recording (GrowthRecording): The recorded growth.
+        background (Tuple[int, int, int]): The background color behind the tree.
+        processes (Optional[int]): Number of worker processes (defaults to the CPU count);
+            1 renders in this process.
+
+    Yields:
+        np.ndarray: (height, width, 3) BGR frames.
+    """
+    if not recording.states:
+        return
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        renderer = StateRenderer(recording.structure(), background)
+        for state in recording.states:
+            yield renderer.render(state)
+        return
+
+    with ProcessPoolExecutor(
+        processes, initializer=_init_worker, initargs=(recording.structure(), background)
+    ) as pool:
+        pending: collections.deque = collections.deque()
+        states = iter(recording.states)
+        for state in states:
+            pending.append(pool.submit(_render_state, state))
+            if len(pending) >= processes * 4:
+                break
+        while pending:
+            frame = pending.popleft().result()
+            state = next(states, None)
+            if state is not None:
+                pending.append(pool.submit(_render_state, state))
+            yield frame
+
+
+def export_growth(
+    tree: Tree,
+    filename: str,
+    fps: int = 60,
+    background: Tuple[int, int, int] = cts.background_color,
+    processes: Optional[int] = None,
+) -> int:
+    """
+    Grow a tree to completion and export its growth as a video (.mp4) or animation (.gif, .apng).
+
+    Args:
+        tree (Tree): The tree to grow.
+        filename (str): The output filename; the extension picks the format.
+        fps (int): Frames per second of the output.
+        background (Tuple[int, int, int]): The background color behind the tree.
+        processes (Optional[int]): Number of rendering processes (defaults to the CPU count).
+
+    Returns:
+        int: The number of frames exported.
+    """
+    recording = record_states(tree)
+    frames = render_frames(recording, background, processes)
+    if filename.lower().endswith(".mp4"):
+        import cv2
+
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        video_writer = cv2.VideoWriter(filename, fourcc, fps, tree.rect.size)
+        try:
+            for frame in frames:
+                video_writer.write(frame)
+        finally:
+            video_writer.release()
+    else:
+        from animation import open_writer
+
+        with open_writer(filename, tree.rect.size, tree.palette, background, fps) as writer:
+            for frame in frames:
+                writer.write(frame[..., ::-1])
+    return len(recording.states)
+
+
+def render_bytes(
+    palette: Dict[str, Tuple[int, int, int]],
+    max_nodes: int,
+    seed: Optional[int] = None,
+    output_format: str = "png",
+    background: Optional[Tuple[int, int, int]] = cts.background_color,
+    config: Optional[TreeConfig] = None,
+    fps: int = 60,
+    scale: int = 1,
+) -> bytes:
+    """
+    Grow a tree and encode it in memory: the finished tree as a PNG, or its growth as an
+    animated GIF or APNG.
+
+    Args:
+        palette (Dict[str, Tuple[int, int, int]]): A dictionary of colors for the tree.
+        max_nodes (int): The maximum number of nodes in the tree.
+        seed (Optional[int]): The tree's random seed.
+        output_format (str): "png", "gif" or "apng".
+        background (Optional[Tuple[int, int, int]]): The background color, or None for a
+            transparent PNG.
+        config (Optional[TreeConfig]): The generation parameters.
+        fps (int): Frames per second of animations.
+        scale (int): Integer upscaling factor of PNG output.
+
+    Returns:
+        bytes: The encoded image.
+
+    Raises:
+        ValueError: If the format is unknown, or an animation is asked for without background
+            or at a scale other than 1.
+    """
+    tree = Tree(palette, max_nodes, config, seed)
+    output = io.BytesIO()
+    if output_format == "png":
+        tree.simulate()
+        if background is None:
+            image = tree.render()
+        else:
+            image = pygame.Surface(tree.rect.size)
+            image.fill(background)
+            image.blit(tree.render(), (0, 0))
+        if scale != 1:
+            image = pygame.transform.scale(image, (image.get_width() * scale, image.get_height() * scale))
+        pygame.image.save(image, output, "tree.png")
+    elif output_format in ("gif", "apng"):
+        if background is None:
+            raise ValueError("Animations need a background color.")
+        if scale != 1:
+            raise ValueError("Animations are only rendered at scale 1.")
+        from animation import ApngWriter, GifWriter, record_growth
+
+        writer_class = GifWriter if output_format == "gif" else ApngWriter
+        with writer_class(output, tree.rect.size, palette, background, fps) as writer:
+            record_growth(tree, writer, background)
+    else:
+        raise ValueError(f"Unsupported output format '{output_format}'.")
+    return output.getvalue()
+
+
+def main() -> None:
+    """
+    Export the growth of a tree from the command line.
+    """
+    from palette import load_palette
+
+    parser = argparse.ArgumentParser(description="Export the growth of a procedural tree.")
+    parser.add_argument("filename", help="output file (.mp4, .gif or .apng)")
+    parser.add_argument("--palette", default="green", help="palette name from palettes.json")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--max-nodes", type=int, default=50, help="maximum number of nodes")
+    parser.add_argument("--fps", type=int, default=60, help="frames per second")
+    parser.add_argument("--processes", type=int, default=None, help="rendering processes")
+    args = parser.parse_args()
+
+    tree = Tree(load_palette(args.palette), args.max_nodes, seed=args.seed)
+    frames = export_growth(tree, args.filename, args.fps, processes=args.processes)
+    print(f"Exported {frames} frames to {args.filename}")
+
+
+if __name__ == "__main__":
+    main()
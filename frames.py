@@ -0,0 +1,169 @@
+"""
+Frames Module
+
+This module stores captured growth frames in a preallocated, disk-backed ring buffer. Pixels
+are copied once, straight from a surface's pixel buffer into the ring in BGR order (what video
+writers expect), so long or high-resolution sessions can be scrubbed and exported without
+holding every frame in RAM or converting them again.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import warnings
+from typing import Iterator, Optional, Tuple
+import constants as cts
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
+
+
+def read_bgr(surface: pygame.Surface, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Copy a surface's pixels into a (height, width, 3) BGR array.
+
+    The pixels are read through a view of the surface buffer, so the only copy made is the one
+    into out.
+
+    Args:
+        surface (pygame.Surface): A 24 or 32-bit surface.
+        out (Optional[np.ndarray]): The array to write to; a new one is allocated if None.
+
+    Returns:
+        np.ndarray: The BGR frame (out, if given).
+    """
+    if out is None:
+        width, height = surface.get_size()
+        out = np.empty((height, width, 3), dtype=np.uint8)
+    view = pygame.surfarray.pixels3d(surface)  # (width, height, RGB), locks the surface
+    try:
+        np.copyto(out, view.transpose(1, 0, 2)[..., ::-1])
+    finally:
+        del view
+    return out
+
+
+class FrameStore:
+    """
+    A fixed-capacity ring of BGR frames in a memory-mapped file.
+
+    Once the ring is full, each new frame replaces the oldest one (with a RuntimeWarning the
+    first time), and dropped counts the frames lost. Indexing and iterating go
+    from the oldest retained frame to the newest, and return views into the file rather than
+    copies.
+
+    Attributes:
+        size (Tuple[int, int]): The (width, height) of the frames.
+        capacity (int): The maximum number of frames retained.
+        background (Tuple[int, int, int]): The color captured surfaces are composited onto.
+        count (int): The total number of frames captured since the last clear.
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int, int],
+        background: Tuple[int, int, int] = cts.background_color,
+        capacity: int = 1024,
+        path: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize a new FrameStore instance. The file is sized up front (sparsely, on most
+        file systems) and never grows.
+
+        Args:
+            size (Tuple[int, int]): The (width, height) of the frames.
+            background (Tuple[int, int, int]): The color captured surfaces are composited onto.
+            capacity (int): The maximum number of frames retained.
+            path (Optional[str]): The backing file. If None, an anonymous temporary file is used
+                and removed when the store is closed.
+        """
+        self.size = size
+        self.capacity = capacity
+        self.background = background
+        self.count = 0
+        width, height = size
+        self._file = tempfile.TemporaryFile() if path is None else None
+        self._frames = np.memmap(
+            self._file if path is None else path,
+            dtype=np.uint8,
+            mode="w+",
+            shape=(capacity, height, width, 3),
+        )
+        self._composite = pygame.Surface(size)  # Reused for every capture
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        """
+        Get a retained frame, 0 being the oldest and -1 the newest.
+
+        Args:
+            index (int): The frame's index.
+
+        Returns:
+            np.ndarray: A (height, width, 3) BGR view into the store.
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("frame index out of range")
+        return self._frames[(self.count - length + index) % self.capacity]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def dropped(self) -> int:
+        """
+        The number of frames overwritten since the last clear because the ring was full.
+        """
+        return max(self.count - self.capacity, 0)
+
+    def capture(self, surface: pygame.Surface) -> None:
+        """
+        Composite a (possibly transparent) surface onto the background and store the result
+        as the next frame.
+
+        Args:
+            surface (pygame.Surface): The surface to capture, of the store's size.
+        """
+        self._composite.fill(self.background)
+        self._composite.blit(surface, (0, 0))
+        if self.count == self.capacity:
+            warnings.warn(
+                f"FrameStore is full ({self.capacity} frames); the oldest frames are being overwritten.",
+                RuntimeWarning,
+            )
+        read_bgr(self._composite, self._frames[self.count % self.capacity])
+        self.count += 1
+
+    def clear(self) -> None:
+        """
+        Forget every frame. The file is kept and overwritten by later captures.
+        """
+        self.count = 0
+
+    def close(self) -> None:
+        """
+        Flush the frames to disk and release the file (deleting it if it is temporary).
+        """
+        if self._frames is None:
+            return
+        self._frames.flush()
+        self._frames = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "FrameStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,41 @@
+"""
+Lazy Module
+
+This module defines a helper for importing heavy dependencies (pygame, NumPy, OpenCV) lazily:
+the module object is available right away, but its code only runs the first time one of its
+attributes is used. Simulation-only runs and short-lived processes never pay for the libraries
+they don't touch.
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a module on first attribute access.
+
+    If the module is already imported, it is returned as is.
+
+    Args:
+        name (str): The absolute name of the module.
+
+    Returns:
+        ModuleType: The module, loaded the first time one of its attributes is used.
+
+    Raises:
+        ModuleNotFoundError: If the module cannot be found.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
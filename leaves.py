@@ -5,22 +5,31 @@ This module defines the Leaves class and related utility functions for generatin
 the leaves of a procedural tree.
 """
 
+from __future__ import annotations
+
+import copy
 import random
-import pygame
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+import constants as cts
+from config import DEFAULT_CONFIG, TreeConfig
+from lazy import lazy_import
+
+pygame = lazy_import("pygame")
 
 
-def random_pos() -> Tuple[int, int]:
+def random_pos(rng=random) -> Tuple[int, int]:
     """
     Generate a random position within the bounds of the leaf surface.
 
+    Args:
+        rng (random.Random): The random number generator to use (defaults to the random module).
+
     Returns:
         Tuple[int, int]: A random (x, y) position.
     """
-    import constants as cts  # Import here to avoid circular dependencies
     return (
-        random.randint(0, cts.leaf_surface_width),
-        random.randint(0, cts.leaf_surface_height),
+        rng.randint(0, cts.leaf_surface_width),
+        rng.randint(0, cts.leaf_surface_height),
     )
 
 
@@ -44,35 +53,69 @@ class Leaves:
     Attributes:
         palette (Dict[str, Tuple[int, int, int]]): A dictionary of colors for the leaves.
         size (Tuple[int, int]): The dimensions of the leaf surface.
-        surface (pygame.Surface): The surface used to render the leaves.
+        surface (pygame.Surface): The surface used to render the leaves (created on first use).
         leaves (list[list[Tuple[int, int]]]): A list of lists containing leaf positions.
     """
 
-    def __init__(self, palette: Dict[str, Tuple[int, int, int]]) -> None:
+    def __init__(
+        self,
+        palette: Dict[str, Tuple[int, int, int]],
+        config: Optional[TreeConfig] = None,
+        rng: Optional[random.Random] = None,
+    ) -> None:
         """
         Initialize a new Leaves instance.
 
         Args:
             palette (Dict[str, Tuple[int, int, int]]): A dictionary of colors for the leaves.
+            config (Optional[TreeConfig]): The generation parameters (defaults to DEFAULT_CONFIG).
+            rng (Optional[random.Random]): The random number generator (defaults to the random module).
         """
-        import constants as cts  # Import here to avoid circular dependencies
         self.palette = palette
         self.size = (cts.leaf_surface_width, cts.leaf_surface_height)
-        self.surface = pygame.Surface(self.size, pygame.SRCALPHA)
+        self._surface: Optional[pygame.Surface] = None
+        density = (config if config is not None else DEFAULT_CONFIG).leaves_density
+        rng = rng if rng is not None else random
         self.leaves = [
-            [random_pos() for _ in range(num_leaves)]
-            for num_leaves in cts.leaves_density
+            [random_pos(rng) for _ in range(num_leaves)]
+            for num_leaves in density
         ]
-        self.generate_surface()
+
+    def recolored(self, palette: Dict[str, Tuple[int, int, int]]) -> "Leaves":
+        """
+        Create leaves with the same positions in a different palette, leaving these untouched.
+
+        Args:
+            palette (Dict[str, Tuple[int, int, int]]): A dictionary of colors for the new leaves.
+
+        Returns:
+            Leaves: The new leaves (their surface is drawn on first use).
+        """
+        leaves = copy.copy(self)
+        leaves.palette = palette
+        leaves._surface = None
+        return leaves
+
+    @property
+    def surface(self) -> pygame.Surface:
+        """
+        The rendered leaves, generated the first time they are needed so that simulation-only
+        trees never draw them.
+        """
+        if self._surface is None:
+            self.generate_surface()
+        return self._surface
 
     def generate_surface(self) -> None:
         """
         Generate the leaf surface by drawing all leaves with their respective colors.
         """
-        self.surface.fill((0, 0, 0, 0))  # Clear the surface before redrawing
+        if self._surface is None:
+            self._surface = pygame.Surface(self.size, pygame.SRCALPHA)
+        self._surface.fill((0, 0, 0, 0))  # Clear the surface before redrawing
         for layer_index, layer in enumerate(self.leaves):
             color_key = f"leaves{layer_index}"
             if color_key not in self.palette:
                 raise KeyError(f"Missing key '{color_key}' in palette.")
             for leaf_pos in layer:
-                draw_leaf(self.surface, self.palette[color_key], leaf_pos)
\ No newline at end of file
+                draw_leaf(self._surface, self.palette[color_key], leaf_pos)
\ No newline at end of file
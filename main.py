@@ -8,12 +8,20 @@ This script generates procedural trees using Pygame and OpenCV. It allows users
 - Change the tree's color palette dynamically using a dropdown menu.
 """
 
+from __future__ import annotations
+
 import pygame
-import cv2
-import numpy as np
+from typing import Iterable, Sequence
+import constants as cts
+from animation import open_writer
+from frames import FrameStore
+from lazy import lazy_import
 from palette import load_palette
 from tree import Tree
 
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
 
 def create_button(width: int, height: int, text: str) -> pygame.Surface:
     """
@@ -51,12 +59,12 @@ def save_tree_image(surface: pygame.Surface, filename: str) -> None:
     print(f"Image saved as {filename}")
 
 
-def save_growth_video(frames: list[np.ndarray], size: tuple[int, int], fps: int, filename: str) -> None:
+def save_growth_video(frames: Iterable[np.ndarray], size: tuple[int, int], fps: int, filename: str) -> None:
     """
-    Save a list of frames as a video file.
+    Save frames as a video file.
 
     Args:
-        frames (list[np.ndarray]): List of frames (as NumPy arrays).
+        frames (Iterable[np.ndarray]): (height, width, 3) BGR frames, such as a FrameStore.
         size (tuple[int, int]): Dimensions of the video (width, height).
         fps (int): Frames per second for the video.
         filename (str): The name of the output video file.
@@ -66,14 +74,38 @@ def save_growth_video(frames: list[np.ndarray], size: tuple[int, int], fps: int,
 
     try:
         for frame in frames:
-            frame = np.transpose(frame, (1, 0, 2))  # Pygame surface is transposed
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
             video_writer.write(frame)
         print(f"Video saved as {filename}")
     finally:
         video_writer.release()
 
 
+def save_growth_animation(
+    frames: Iterable[np.ndarray],
+    size: tuple[int, int],
+    palettes: Sequence[dict],
+    background: tuple[int, int, int],
+    fps: int,
+    filename: str,
+) -> None:
+    """
+    Save frames as an animated GIF or APNG, depending on the filename's extension.
+
+    Args:
+        frames (Iterable[np.ndarray]): (height, width, 3) BGR frames, such as a FrameStore.
+        size (tuple[int, int]): Dimensions of the animation (width, height).
+        palettes (Sequence[dict]): Every palette the frames were drawn with, so that none of
+            their colors are lost.
+        background (tuple[int, int, int]): The background color behind the tree.
+        fps (int): Frames per second for the animation.
+        filename (str): The name of the output file.
+    """
+    with open_writer(filename, size, palettes, background, fps) as writer:
+        for frame in frames:
+            writer.write(frame[..., ::-1])
+    print(f"Animation saved as {filename}")
+
+
 def draw_dropdown(window, dropdown_rect, options, selected_option):
     """
     Draw a simulated dropdown menu.
@@ -130,12 +162,14 @@ def main():
     )  # Centered dropdown
 
     # Background image
-    image = pygame.Surface(tree.surface.size, pygame.SRCALPHA)
-    image.fill((130, 170, 70, 255))
+    background_color = cts.background_color
+    image = pygame.Surface(tree.rect.size, pygame.SRCALPHA)
+    image.fill(background_color)
 
-    # Video settings
+    # Video settings: frames are kept in a disk-backed ring instead of RAM
     video_fps = 60
-    frames = []
+    frames = FrameStore(tree.rect.size, background_color)
+    frame_palettes = [tree.palette]  # Every palette used since the frames were last cleared
 
     # Main loop
     running = True
@@ -143,12 +177,10 @@ def main():
     while running:
         # Grow the tree and capture frames
         if tree.grow():
-            new_image = image.copy()
-            new_image.blit(tree.surface, (0, 0))
-            frames.append(pygame.surfarray.array3d(new_image))
+            frames.capture(tree.surface)
 
         # Draw everything
-        window.fill((130, 170, 70))
+        window.fill(background_color)
         tree.draw(window, (0, 0))
         window.blit(new_tree_button_surf, new_tree_button_rect)
         window.blit(save_button_surf, save_button_rect)
@@ -179,6 +211,7 @@ def main():
                 if new_tree_button_rect.collidepoint(event.pos):
                     tree = Tree(load_palette(selected_palette), 50)
                     frames.clear()
+                    frame_palettes = [tree.palette]
                     print("Generating new tree...")
                 # Handle "Save" button
                 elif save_button_rect.collidepoint(event.pos):
@@ -188,7 +221,15 @@ def main():
                     save_tree_image(new_image, 'tree.png')
 
                     # Save the growth video
+                    if frames.dropped:
+                        print(
+                            f"Warning: only the last {len(frames)} of {frames.count} frames were kept, "
+                            f"so the saved growth starts {frames.dropped} frames in."
+                        )
                     save_growth_video(frames, tree.surface.size, video_fps, "video.mp4")
+                    save_growth_animation(
+                        frames, tree.surface.size, frame_palettes, background_color, video_fps, "video.gif"
+                    )
                 # Handle dropdown menu toggle
                 elif dropdown_rect.collidepoint(event.pos):
                     dropdown_expanded = not dropdown_expanded
@@ -202,10 +243,13 @@ def main():
                             try:
                                 new_palette = load_palette(selected_palette)
                                 tree.change_color(new_palette)
+                                if new_palette not in frame_palettes:
+                                    frame_palettes.append(new_palette)
                                 print(f"Changed tree color to '{selected_palette}' palette.")
                             except KeyError as e:
                                 print(f"Error: {e}")
 
+    frames.close()
     pygame.quit()
 
 
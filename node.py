@@ -4,13 +4,19 @@ Node Module
 This module defines the Node class and related utility functions for generating procedural trees.
 """
 
+from __future__ import annotations
+
+import copy as _copy
 import math
 import random
-import pygame
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 import constants as cts
+from config import DEFAULT_CONFIG, TreeConfig
+from lazy import lazy_import
 from leaves import Leaves
 
+pygame = lazy_import("pygame")
+
 
 class Node:
     """
@@ -21,12 +27,25 @@ class Node:
         length (int): The length of the branch.
         angle (int): The angle of the branch (in degrees).
         palette (Dict[str, Tuple[int, int, int]]): A dictionary of colors for the node.
+        config (TreeConfig): The generation parameters of the tree.
+        rng (random.Random): The random number generator used for growth.
         leaves (Leaves): The leaves associated with this node.
+        size (int): The number of nodes in this node's subtree, kept up to date by the Tree.
+        owner (Optional[object]): Token of the tree allowed to modify this node in place; nodes
+            owned by nobody may be shared between tree snapshots (see Tree.snapshot).
         left (Optional[Node]): The left child node.
         right (Optional[Node]): The right child node.
     """
 
-    def __init__(self, age: int, length: int, angle: int, palette: Dict[str, Tuple[int, int, int]]) -> None:
+    def __init__(
+        self,
+        age: int,
+        length: int,
+        angle: int,
+        palette: Dict[str, Tuple[int, int, int]],
+        config: Optional[TreeConfig] = None,
+        rng: Optional[random.Random] = None,
+    ) -> None:
         """
         Initialize a new Node instance.
 
@@ -35,12 +54,18 @@ class Node:
             length (int): The initial length of the branch.
             angle (int): The initial angle of the branch (in degrees).
             palette (Dict[str, Tuple[int, int, int]]): A dictionary of colors for the node.
+            config (Optional[TreeConfig]): The generation parameters (defaults to DEFAULT_CONFIG).
+            rng (Optional[random.Random]): The random number generator (defaults to the random module).
         """
         self.age = age
         self.length = length
         self.angle = angle
         self.palette = palette
-        self.leaves = Leaves(self.palette)
+        self.config = config if config is not None else DEFAULT_CONFIG
+        self.rng = rng if rng is not None else random
+        self.leaves = Leaves(self.palette, self.config, self.rng)
+        self.size = 1
+        self.owner: Optional[object] = None
         self.left: Optional[Node] = None
         self.right: Optional[Node] = None
 
@@ -51,9 +76,10 @@ class Node:
         Args:
             age (int): The age of the parent node.
         """
-        length = max(random.randint(cts.min_length, cts.max_length) - age, cts.min_length)
-        angle = random.randint(cts.min_angle_left, cts.max_angle_left)
-        self.left = Node(age * 2, length, angle, self.palette)
+        cfg = self.config
+        length = max(self.rng.randint(cfg.min_length, cfg.max_length) - age, cfg.min_length)
+        angle = self.rng.randint(cfg.min_angle_left, cfg.max_angle_left)
+        self.left = Node(age * 2, length, angle, self.palette, cfg, self.rng)
 
     def add_right(self, age: int) -> None:
         """
@@ -62,9 +88,10 @@ class Node:
         Args:
             age (int): The age of the parent node.
         """
-        length = max(random.randint(cts.min_length, cts.max_length) - age, cts.min_length)
-        angle = random.randint(cts.min_angle_right, cts.max_angle_right)
-        self.right = Node(age * 2, length, angle, self.palette)
+        cfg = self.config
+        length = max(self.rng.randint(cfg.min_length, cfg.max_length) - age, cfg.min_length)
+        angle = self.rng.randint(cfg.min_angle_right, cfg.max_angle_right)
+        self.right = Node(age * 2, length, angle, self.palette, cfg, self.rng)
 
     def grow(self, age: int) -> None:
         """
@@ -73,14 +100,14 @@ class Node:
         Args:
             age (int): The current age of the tree.
         """
-        number = random.randint(1, 3)
+        number = self.rng.randint(1, 3)
         if number == 1 and self.left is None:
             self.add_left(age)
         elif number == 2 and self.right is None:
             self.add_right(age)
         else:
-            self.length += cts.grow_length_change
-            self.age += cts.grow_age_change
+            self.length += self.config.grow_length_change
+            self.age += self.config.grow_age_change
 
     def bend(self, angle_increment: float) -> None:
         """
@@ -89,30 +116,32 @@ class Node:
         Args:
             angle_increment (float): The amount to adjust the angle.
         """
-        if self.angle > cts.max_angle_left or self.angle < cts.min_angle_right:
+        cfg = self.config
+        if self.angle > cfg.max_angle_left or self.angle < cfg.min_angle_right:
             return
         self.angle += angle_increment
-        self.age += cts.bend_age_change
+        self.age += cfg.bend_age_change
         if self.left is not None:
-            self.left.age += cts.bend_age_change
+            self.left.age += cfg.bend_age_change
         if self.right is not None:
-            self.right.age += cts.bend_age_change
+            self.right.age += cfg.bend_age_change
 
-    def change_color(self, new_palette: Dict[str, Tuple[int, int, int]]) -> None:
+    def clone(self) -> "Node":
         """
-        Change the node's color palette.
+        Create a shallow copy of the node that shares its children and leaves.
 
-        Args:
-            new_palette (Dict[str, Tuple[int, int, int]]): A new dictionary of colors.
+        Returns:
+            Node: The copy, owned by nobody.
         """
-        self.palette = new_palette
-        self.leaves.palette = self.palette
-        self.leaves.generate_surface()
+        node = _copy.copy(self)
+        node.owner = None
+        return node
 
 
 def copy(node: Optional[Node]) -> Optional[Node]:
     """
-    Recursively copy a node and its children.
+    Recursively copy a node and its children. The copies share the original leaves, so they
+    look exactly like the originals.
 
     Args:
         node (Optional[Node]): The node to copy.
@@ -122,7 +151,7 @@ def copy(node: Optional[Node]) -> Optional[Node]:
     """
     if node is None:
         return None
-    new_node = Node(node.age, node.length, node.angle, node.palette)
+    new_node = node.clone()
     new_node.left = copy(node.left)
     new_node.right = copy(node.right)
     return new_node
@@ -143,6 +172,29 @@ def count(node: Optional[Node]) -> int:
     return 1 + count(node.left) + count(node.right)
 
 
+def path_to(node: Optional[Node], target: Node) -> Optional[List[Node]]:
+    """
+    Find the path from a node down to one of its descendants.
+
+    Args:
+        node (Optional[Node]): The root node of the tree.
+        target (Node): The node to find.
+
+    Returns:
+        Optional[List[Node]]: The nodes from node to target (both included), or None if the
+        target is not in the tree.
+    """
+    if node is None:
+        return None
+    if node is target:
+        return [node]
+    for child in (node.left, node.right):
+        path = path_to(child, target)
+        if path is not None:
+            return [node] + path
+    return None
+
+
 def youngest(node: Optional[Node]) -> Tuple[int, Optional[Node]]:
     """
     Find the youngest node in a tree.
@@ -216,7 +268,8 @@ def get_position(start: Tuple[float, float], radius: float, angle: float) -> Tup
 
 def draw_branches(node: Optional[Node], start: Tuple[float, float], window: pygame.Surface) -> None:
     """
-    Recursively draw all branches in a tree.
+    Recursively draw all branches in a tree. Branch widths come from the nodes' subtree sizes,
+    which Tree keeps up to date (see Tree.reindex).
 
     Args:
         node (Optional[Node]): The current node.
@@ -226,7 +279,7 @@ def draw_branches(node: Optional[Node], start: Tuple[float, float], window: pyga
     if node is None:
         return
     pos = get_position(start, node.length, math.radians(node.angle))
-    width = count(node) ** cts.trunk_width_power
+    width = node.size ** node.config.trunk_width_power
 
     pygame.draw.circle(window, node.palette["trunk0"], pos, width * 0.6)
     draw_parallel_lines(start, pos, math.radians(node.angle + 90), width, node.palette, window)
@@ -234,35 +287,45 @@ def draw_branches(node: Optional[Node], start: Tuple[float, float], window: pyga
     draw_branches(node.right, pos, window)
 
 
-def draw_leaves(node: Optional[Node], start: Tuple[float, float], window: pygame.Surface) -> None:
+def leaf_positions(
+    node: Optional[Node],
+    start: Tuple[float, float],
+    leaf_nodes: Set[Node],
+    out: List[Tuple[Node, Tuple[int, int]]],
+) -> List[Tuple[Node, Tuple[int, int]]]:
     """
-    Recursively draw all leaves in a tree.
+    Collect where each leaf-bearing node's leaves go, in drawing order (preorder).
 
     Args:
         node (Optional[Node]): The current node.
         start (Tuple[float, float]): The starting point of the branch.
-        window (pygame.Surface): The surface to draw on.
+        leaf_nodes (Set[Node]): The nodes that carry leaves.
+        out (List[Tuple[Node, Tuple[int, int]]]): The list to append (node, top-left) pairs to.
+
+    Returns:
+        List[Tuple[Node, Tuple[int, int]]]: The out list.
     """
     if node is None:
-        return
+        return out
     pos = get_position(start, node.length, math.radians(node.angle))
-    top_left_pos = (
-        pos[0] - cts.leaf_surface_width / 2,
-        pos[1] - cts.leaf_surface_height / 2,
-    )
-
-    if count(node) < cts.children_for_leaves:
-        window.blit(node.leaves.surface, top_left_pos)
-    draw_leaves(node.left, pos, window)
-    draw_leaves(node.right, pos, window)
-
-
-def random_child(node: Optional[Node]) -> Optional[Node]:
+    if node in leaf_nodes:
+        # Truncate like Surface.blit does with float positions
+        out.append((node, (
+            int(pos[0] - cts.leaf_surface_width / 2),
+            int(pos[1] - cts.leaf_surface_height / 2),
+        )))
+    leaf_positions(node.left, pos, leaf_nodes, out)
+    leaf_positions(node.right, pos, leaf_nodes, out)
+    return out
+
+
+def random_child(node: Optional[Node], rng: Optional[random.Random] = None) -> Optional[Node]:
     """
     Select a random child node from the tree.
 
     Args:
         node (Optional[Node]): The root node of the tree.
+        rng (Optional[random.Random]): The random number generator (defaults to the root's).
 
     Returns:
         Optional[Node]: A randomly selected child node.
@@ -270,26 +333,12 @@ def random_child(node: Optional[Node]) -> Optional[Node]:
     if node is None or node.left is None or node.right is None:
         return None
 
+    rng = rng if rng is not None else node.rng
     choices = [
         node,
-        random_child(node.left),
-        random_child(node.left),
-        random_child(node.right),
-        random_child(node.right),
+        random_child(node.left, rng),
+        random_child(node.left, rng),
+        random_child(node.right, rng),
+        random_child(node.right, rng),
     ]
-    return random.choice([valid for valid in choices if valid is not None])
-
-
-def change_palette(node: Optional[Node], new_palette: Dict[str, Tuple[int, int, int]]) -> None:
-    """
-    Recursively change the color palette of a tree.
-
-    Args:
-        node (Optional[Node]): The root node of the tree.
-        new_palette (Dict[str, Tuple[int, int, int]]): A new dictionary of colors.
-    """
-    if node is None:
-        return
-    node.change_color(new_palette)
-    change_palette(node.right, new_palette)
-    change_palette(node.left, new_palette)
\ No newline at end of file
+    return rng.choice([valid for valid in choices if valid is not None])
@@ -0,0 +1,65 @@
+"""
+Procedural Tree Module
+
+This module is the library entry point of the project. Importing it is nearly free: each name
+is imported from its defining module the first time it is used, and pygame, NumPy and OpenCV
+are only loaded once something actually renders, sweeps or encodes video.
+
+Example:
+    import procedural_tree as pt
+
+    tree = pt.Tree(pt.load_palette("green"), 50, seed=1)
+    tree.simulate()
+"""
+
+import importlib
+from typing import Any, Dict, List
+
+_EXPORTS: Dict[str, str] = {
+    "Tree": "tree",
+    "TreeConfig": "config",
+    "DEFAULT_CONFIG": "config",
+    "load_palette": "palette",
+    "tree_stats": "sweep",
+    "grow_stats": "sweep",
+    "sweep": "sweep",
+    "config_grid": "sweep",
+    "open_writer": "animation",
+    "GifWriter": "animation",
+    "ApngWriter": "animation",
+    "record_growth": "animation",
+    "record_states": "export",
+    "export_growth": "export",
+    "render_bytes": "export",
+    "render_trees": "batch",
+    "render_pngs": "batch",
+    "RenderCache": "cache",
+    "render_cached": "cache",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Import a public name from its module on first use.
+
+    Args:
+        name (str): The attribute being looked up.
+
+    Returns:
+        Any: The attribute.
+
+    Raises:
+        AttributeError: If the name is not part of the public API.
+    """
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,409 @@
+"""
+Server Module
+
+This module runs a local render service so that tools written in other languages can generate
+trees without starting a Pygame window per request. It speaks a minimal HTTP/1.1 over localhost
+or a Unix socket:
+
+    POST /render  {"seed": 1, "palette": "green", "max_nodes": 50, "format": "png"}
+
+and answers with the encoded image. Queued requests are batched onto a pool of warm worker
+processes (Pygame initialized, palettes loaded), identical requests in flight are rendered
+once, and results are kept in an in-memory LRU cache.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+import constants as cts
+
+
+CONTENT_TYPES = {"png": "image/png", "gif": "image/gif", "apng": "image/apng"}
+MAX_NODES_LIMIT = 200
+
+_palettes: Dict[str, dict] = {}
+
+
+def _init_worker() -> None:
+    """
+    Warm up a worker process: import Pygame and the tree modules, load every palette and render
+    a small tree so the first real request does not pay for any of it.
+    """
+    global _palettes
+    import export
+    import palette
+
+    _palettes = palette.load()
+    export.render_bytes(next(iter(_palettes.values())), 2, seed=0)
+
+
+def render_batch(keys: List[tuple]) -> List[Tuple[str, object]]:
+    """
+    Render a batch of requests inside a worker process. Each request succeeds or fails on its
+    own, so one bad request never fails the others in its batch.
+
+    Args:
+        keys (List[tuple]): Normalized requests, as built by parse_request.
+
+    Returns:
+        List[Tuple[str, object]]: For each request, ("ok", image bytes), ("invalid", message)
+        if the request was rejected, or ("error", message) if rendering failed.
+    """
+    from export import render_bytes
+
+    results = []
+    for seed, palette, max_nodes, output_format, background in keys:
+        try:
+            if isinstance(palette, str):
+                if palette not in _palettes:
+                    raise KeyError(f"Palette '{palette}' not found.")
+                colors = _palettes[palette]
+            else:
+                colors = dict(palette)
+            results.append(("ok", render_bytes(colors, max_nodes, seed, output_format, background)))
+        except (KeyError, ValueError) as e:
+            results.append(("invalid", str(e.args[0]) if e.args else str(e)))
+        except Exception as e:
+            results.append(("error", f"Render failed: {type(e).__name__}: {e}"))
+    return results
+
+
+class RequestError(Exception):
+    """
+    Raised for malformed render requests; reported to the client as 400 Bad Request.
+    """
+
+
+class RenderError(Exception):
+    """
+    Raised when rendering fails on the server's side; reported to the client as 500 Internal
+    Server Error, or 503 Service Unavailable if the worker pool had to be restarted.
+
+    Attributes:
+        unavailable (bool): True if the failure was a crashed worker pool.
+    """
+
+    def __init__(self, message: str, unavailable: bool = False) -> None:
+        super().__init__(message)
+        self.unavailable = unavailable
+
+
+def parse_request(body: bytes) -> tuple:
+    """
+    Validate a JSON render request and normalize it into a hashable cache key.
+
+    Args:
+        body (bytes): The JSON request body.
+
+    Returns:
+        tuple: (seed, palette, max_nodes, format, background). The palette is either a palette
+        name or a sorted tuple of (color name, RGBA tuple) pairs. A missing seed is replaced
+        by a random one.
+
+    Raises:
+        RequestError: If the request is invalid.
+    """
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError:
+        raise RequestError("Request body is not valid JSON.")
+    if not isinstance(request, dict):
+        raise RequestError("Request body must be a JSON object.")
+
+    seed = request.get("seed")
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    max_nodes = request.get("max_nodes", 50)
+    output_format = request.get("format", "png")
+    palette = request.get("palette", "green")
+    background = request.get("background", cts.background_color)
+
+    if not isinstance(seed, int):
+        raise RequestError("'seed' must be an integer.")
+    if not isinstance(max_nodes, int) or not 1 <= max_nodes <= MAX_NODES_LIMIT:
+        raise RequestError(f"'max_nodes' must be an integer from 1 to {MAX_NODES_LIMIT}.")
+    if output_format not in CONTENT_TYPES:
+        raise RequestError(f"'format' must be one of {', '.join(CONTENT_TYPES)}.")
+    if isinstance(palette, dict):
+        try:
+            palette = tuple(sorted((str(name), tuple(int(c) for c in color)) for name, color in palette.items()))
+        except (TypeError, ValueError):
+            raise RequestError("'palette' colors must be lists of integers.")
+        for name, color in palette:
+            if len(color) not in (3, 4) or not all(0 <= c <= 255 for c in color):
+                raise RequestError(f"'palette' color '{name}' must be 3 or 4 integers from 0 to 255.")
+    elif not isinstance(palette, str):
+        raise RequestError("'palette' must be a palette name or an object of colors.")
+    if background is not None:
+        if not isinstance(background, (list, tuple)) or len(background) != 3:
+            raise RequestError("'background' must be an [r, g, b] list or null.")
+        try:
+            background = tuple(int(c) for c in background)
+        except (TypeError, ValueError):
+            raise RequestError("'background' colors must be integers.")
+        if not all(0 <= c <= 255 for c in background):
+            raise RequestError("'background' colors must be from 0 to 255.")
+    return seed, palette, max_nodes, output_format, background
+
+
+class RenderService:
+    """
+    Batches render requests onto a pool of warm worker processes and caches the results.
+
+    Attributes:
+        workers (int): The number of worker processes.
+        batch_size (int): The largest number of requests sent to a worker at once.
+        batch_window (float): How long (in seconds) to wait for more requests to fill a batch.
+        cache_size (int): The number of results kept in the LRU cache.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        batch_size: int = 8,
+        batch_window: float = 0.005,
+        cache_size: int = 256,
+    ) -> None:
+        """
+        Initialize a new RenderService instance.
+
+        Args:
+            workers (Optional[int]): The number of worker processes (defaults to the CPU count).
+            batch_size (int): The largest number of requests sent to a worker at once.
+            batch_window (float): How long (in seconds) to wait for more requests to fill a batch.
+            cache_size (int): The number of results kept in the LRU cache.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.cache_size = cache_size
+        self._cache: "collections.OrderedDict[tuple, bytes]" = collections.OrderedDict()
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """
+        Start the worker processes and the batching loop.
+        """
+        self._queue = asyncio.Queue()
+        self._pool_lock = asyncio.Lock()
+        await self._start_pool()
+        self._tasks = [asyncio.create_task(self._batch_loop()) for _ in range(self.workers)]
+
+    async def _start_pool(self) -> None:
+        """
+        Start a new pool of worker processes and warm every worker up, so the first requests
+        do not pay for startup.
+        """
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, render_batch, []) for _ in range(self.workers)))
+
+    async def _restart_pool(self, broken: ProcessPoolExecutor) -> None:
+        """
+        Replace a broken worker pool. Batches that failed on the same pool only restart it once.
+
+        Args:
+            broken (ProcessPoolExecutor): The pool that broke.
+        """
+        async with self._pool_lock:
+            if self._pool is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            await self._start_pool()
+
+    async def close(self) -> None:
+        """
+        Stop the batching loop and shut down the worker processes.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    async def render(self, key: tuple) -> Tuple[bytes, bool]:
+        """
+        Get the image for a normalized request, from the cache or by rendering it.
+
+        Args:
+            key (tuple): A request normalized by parse_request.
+
+        Returns:
+            Tuple[bytes, bool]: The image bytes and whether they came from the cache.
+
+        Raises:
+            RequestError: If the worker rejected the request.
+            RenderError: If rendering failed on the server's side.
+        """
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key], True
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+            await self._queue.put(key)
+        return await asyncio.shield(future), False
+
+    async def _batch_loop(self) -> None:
+        """
+        Take queued requests in batches and render each batch on a worker. One loop runs per
+        worker, so every worker always has at most one batch queued.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            pool = self._pool
+            try:
+                results = await loop.run_in_executor(pool, render_batch, batch)
+            except Exception as e:  # A crashed worker fails its batch, not the service
+                broken = isinstance(e, BrokenProcessPool)
+                if broken:
+                    error = RenderError("A render worker crashed; please retry.", unavailable=True)
+                else:
+                    error = RenderError(f"Render failed: {e}")
+                for key in batch:
+                    self._in_flight.pop(key).set_exception(error)
+                if broken:
+                    try:
+                        await self._restart_pool(pool)
+                    except Exception:  # Still broken; the next batch tries again
+                        pass
+                continue
+            for key, (status, result) in zip(batch, results):
+                future = self._in_flight.pop(key)
+                if status == "ok":
+                    self._cache[key] = result
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                    future.set_result(result)
+                elif status == "invalid":
+                    future.set_exception(RequestError(result))
+                else:
+                    future.set_exception(RenderError(result))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve HTTP requests on one connection until the client closes it.
+
+        Args:
+            reader (asyncio.StreamReader): The connection's reader.
+            writer (asyncio.StreamWriter): The connection's writer.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                keep_alive = headers.get("connection", "").lower() != "close" and version.strip() == "HTTP/1.1"
+
+                status, content_type, payload, extra = await self._respond(method, path, body)
+                head = [
+                    f"HTTP/1.1 {status}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(payload)}",
+                    "Connection: " + ("keep-alive" if keep_alive else "close"),
+                ]
+                head += [f"{name}: {value}" for name, value in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, path: str, body: bytes) -> Tuple[str, str, bytes, Dict[str, str]]:
+        """
+        Build the response to one request: (status, content type, body, extra headers).
+        """
+        if path != "/render":
+            return "404 Not Found", "text/plain", b"Not found\n", {}
+        if method != "POST":
+            return "405 Method Not Allowed", "text/plain", b"Use POST\n", {"Allow": "POST"}
+        try:
+            key = parse_request(body)
+            image, cached = await self.render(key)
+        except RequestError as e:
+            return "400 Bad Request", "text/plain", f"{e}\n".encode(), {}
+        except RenderError as e:
+            status = "503 Service Unavailable" if e.unavailable else "500 Internal Server Error"
+            return status, "text/plain", f"{e}\n".encode(), {"Retry-After": "1"} if e.unavailable else {}
+        headers = {"X-Tree-Seed": str(key[0]), "X-Cache": "hit" if cached else "miss"}
+        return "200 OK", CONTENT_TYPES[key[3]], image, headers
+
+
+async def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    unix_socket: Optional[str] = None,
+    **options,
+) -> None:
+    """
+    Run the render service until cancelled.
+
+    Args:
+        host (str): The address to listen on (ignored when unix_socket is given).
+        port (int): The TCP port to listen on.
+        unix_socket (Optional[str]): Path of a Unix socket to listen on instead of TCP.
+        **options: Options for RenderService.
+    """
+    service = RenderService(**options)
+    await service.start()
+    if unix_socket is not None:
+        server = await asyncio.start_unix_server(service.handle, unix_socket)
+        print(f"Serving trees on {unix_socket}")
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        print(f"Serving trees on http://{host}:{port}/render")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main() -> None:
+    """
+    Run the render service from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Serve procedural tree renders over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--unix-socket", default=None, help="listen on a Unix socket instead")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--cache-size", type=int, default=256, help="results kept in memory")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix_socket, workers=args.workers, cache_size=args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Startup Benchmark
+
+This script measures how long a fresh Python process takes before it does real work: the
+cold import of the library entry point, the first simulated tree and the first rendered image.
+For comparison it also times importing pygame, NumPy and OpenCV up front, which is what every
+process used to pay. Each measurement runs in a new interpreter, and the median is reported.
+
+Usage:
+    python startup_benchmark.py [--runs N] [--max-nodes N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# Run in a fresh interpreter; prints a JSON object of timings in milliseconds
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+{eager}
+eager = time.perf_counter()
+import procedural_tree as pt
+imported = time.perf_counter()
+tree = pt.Tree(pt.load_palette("green"), {max_nodes}, seed=1)
+tree.simulate()
+simulated = time.perf_counter()
+pt.render_bytes(pt.load_palette("green"), {max_nodes}, seed=1)
+rendered = time.perf_counter()
+print(json.dumps({{
+    "heavy imports": (eager - start) * 1000,
+    "import procedural_tree": (imported - eager) * 1000,
+    "first simulated tree": (simulated - imported) * 1000,
+    "first rendered png": (rendered - simulated) * 1000,
+}}))
+"""
+EAGER = "import cv2, numpy, pygame"
+
+
+def run_child(eager: bool, max_nodes: int) -> Dict[str, float]:
+    """
+    Time one fresh interpreter.
+
+    Args:
+        eager (bool): Whether to import the heavy libraries up front first.
+        max_nodes (int): The maximum number of nodes of the benchmark tree.
+
+    Returns:
+        Dict[str, float]: The timings in milliseconds.
+    """
+    code = CHILD.format(eager=EAGER if eager else "", max_nodes=max_nodes)
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the median timings.
+    """
+    parser = argparse.ArgumentParser(description="Measure cold-start latency.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument("--max-nodes", type=int, default=20, help="maximum number of nodes")
+    args = parser.parse_args()
+
+    for eager in (False, True):
+        runs: List[Dict[str, float]] = [run_child(eager, args.max_nodes) for _ in range(args.runs)]
+        print("eager imports:" if eager else "lazy imports:")
+        for name in runs[0]:
+            print(f"  {name:<24} {statistics.median(run[name] for run in runs):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Sweep Module
+
+This module grows large grids of (config, seed) pairs in simulation-only mode and collects
+shape statistics for every tree into a columnar table of NumPy arrays, without rendering.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import constants as cts
+import node as nd
+from config import TreeConfig
+from lazy import lazy_import
+from tree import Tree
+
+np = lazy_import("numpy")
+
+
+STAT_COLUMNS = [
+    "node_count",
+    "depth",
+    "leaf_count",
+    "min_x",
+    "max_x",
+    "min_y",
+    "max_y",
+    "steps",
+]
+
+
+def tree_stats(tree: Tree) -> Tuple[float, ...]:
+    """
+    Measure the shape of a tree in a single pass over its nodes.
+
+    The bounding box covers every branch end point (and the trunk base) in tree surface
+    coordinates; leaf_count is the number of leaf-bearing branches.
+
+    Args:
+        tree (Tree): The tree to measure.
+
+    Returns:
+        Tuple[float, ...]: The statistics, in STAT_COLUMNS order (steps is the tree's age).
+    """
+    threshold = tree.config.children_for_leaves
+    xs: List[float] = [cts.tree_base_pos[0]]
+    ys: List[float] = [cts.tree_base_pos[1]]
+    leaves = 0
+    max_depth = 0
+
+    def visit(node: nd.Node, start: Tuple[float, float], depth: int) -> int:
+        nonlocal leaves, max_depth
+        pos = nd.get_position(start, node.length, math.radians(node.angle))
+        xs.append(pos[0])
+        ys.append(pos[1])
+        max_depth = max(max_depth, depth)
+        size = 1
+        if node.left is not None:
+            size += visit(node.left, pos, depth + 1)
+        if node.right is not None:
+            size += visit(node.right, pos, depth + 1)
+        if size < threshold:
+            leaves += 1
+        return size
+
+    count = visit(tree.root, cts.tree_base_pos, 1)
+    return (count, max_depth, leaves, min(xs), max(xs), min(ys), max(ys), tree.age)
+
+
+def grow_stats(config: TreeConfig, seed: int, max_nodes: int) -> Tuple[float, ...]:
+    """
+    Grow one tree to completion without rendering and measure it.
+
+    Args:
+        config (TreeConfig): The generation parameters.
+        seed (int): The tree's random seed.
+        max_nodes (int): The maximum number of nodes in the tree.
+
+    Returns:
+        Tuple[float, ...]: The statistics, in STAT_COLUMNS order.
+    """
+    tree = Tree({}, max_nodes, config, seed)
+    tree.simulate()
+    return tree_stats(tree)
+
+
+def _grow_stats(job: Tuple[TreeConfig, int, int]) -> Tuple[float, ...]:
+    return grow_stats(*job)
+
+
+def sweep(
+    configs: Sequence[TreeConfig],
+    seeds: Sequence[int],
+    max_nodes: int = 50,
+    processes: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Grow every (config, seed) pair and collect their shape statistics.
+
+    Args:
+        configs (Sequence[TreeConfig]): The configs to try.
+        seeds (Sequence[int]): The seeds to grow for each config.
+        max_nodes (int): The maximum number of nodes per tree.
+        processes (Optional[int]): Number of worker processes (defaults to the CPU count);
+            1 runs in this process.
+
+    Returns:
+        Dict[str, np.ndarray]: One array per column, one row per tree. "config" holds the index
+        into configs, "seed" the seed, followed by the STAT_COLUMNS.
+    """
+    jobs = [(config, seed, max_nodes) for config, seed in itertools.product(configs, seeds)]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        rows = [_grow_stats(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            rows = list(pool.map(_grow_stats, jobs, chunksize=max(1, len(jobs) // (processes * 8))))
+
+    table = np.array(rows, dtype=np.float64).reshape(len(jobs), len(STAT_COLUMNS))
+    columns = {
+        "config": np.repeat(np.arange(len(configs)), len(seeds)),
+        "seed": np.tile(np.asarray(seeds, dtype=np.int64), len(configs)),
+    }
+    for i, name in enumerate(STAT_COLUMNS):
+        columns[name] = table[:, i]
+    for name in ("node_count", "depth", "leaf_count", "steps"):
+        columns[name] = columns[name].astype(np.int64)
+    return columns
+
+
+def config_grid(base: Optional[TreeConfig] = None, **values: Sequence) -> List[TreeConfig]:
+    """
+    Build every combination of the given parameter values on top of a base config.
+
+    Example: config_grid(grow_age_change=[8, 12, 16], trunk_width_power=[0.6, 0.75])
+
+    Args:
+        base (Optional[TreeConfig]): The config to vary (defaults to TreeConfig()).
+        **values (Sequence): Candidate values for each parameter to vary.
+
+    Returns:
+        List[TreeConfig]: One config per combination.
+    """
+    base = base if base is not None else TreeConfig()
+    names = list(values)
+    return [
+        base.replace(**dict(zip(names, combination)))
+        for combination in itertools.product(*(values[name] for name in names))
+    ]
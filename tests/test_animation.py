@@ -0,0 +1,141 @@
+"""
+Regression tests for the streaming GIF/APNG writers and their LZW encoder.
+"""
+
+import io
+import random
+
+import numpy as np
+import pygame
+import pytest
+
+import animation
+import constants as cts
+from palette import load_palette
+from tree import Tree
+
+
+def lzw_decode(data: bytes, min_code_size: int) -> bytes:
+    """
+    A plain GIF LZW decoder, written independently of the encoder under test.
+    """
+    clear_code = 1 << min_code_size
+    end_code = clear_code + 1
+    code_size = min_code_size + 1
+    table = [bytes([i]) for i in range(clear_code)] + [b"", b""]
+    bits = int.from_bytes(data, "little")
+    position = 0
+    previous = None
+    output = bytearray()
+    while True:
+        code = (bits >> position) & ((1 << code_size) - 1)
+        position += code_size
+        if code == clear_code:
+            table = table[:end_code + 1]
+            code_size = min_code_size + 1
+            previous = None
+            continue
+        if code == end_code:
+            return bytes(output)
+        if previous is None:
+            entry = table[code]
+        elif code < len(table):
+            entry = table[code]
+            table.append(previous + entry[:1])
+        else:
+            entry = previous + previous[:1]
+            table.append(entry)
+        output += entry
+        if len(table) == 1 << code_size and code_size < 12:
+            code_size += 1
+        previous = entry
+
+
+@pytest.mark.parametrize("min_code_size", [2, 4, 8])
+def test_lzw_round_trip(min_code_size):
+    rng = random.Random(min_code_size)
+    symbols = 1 << min_code_size
+    data = bytearray()
+    # Long single-index runs exercise the run fast path, noise fills the code table past 4096
+    for _ in range(300):
+        if rng.random() < 0.5:
+            data += bytes([rng.randrange(symbols)]) * rng.randrange(1, 2000)
+        else:
+            data += bytes(rng.randrange(symbols) for _ in range(rng.randrange(1, 200)))
+    data = bytes(data)
+    assert lzw_decode(animation.lzw_encode(data, min_code_size), min_code_size) == data
+
+
+def test_lzw_empty_and_single_symbol():
+    assert lzw_decode(animation.lzw_encode(b"", 2), 2) == b""
+    assert lzw_decode(animation.lzw_encode(b"\x01", 2), 2) == b"\x01"
+
+
+def grow_frames(palette_name, seed, max_nodes=25, recolor=None):
+    """
+    Grow a tree, returning each frame (as an RGB array) composited onto the background.
+    If recolor is given, the tree switches to that palette halfway through.
+    """
+    tree = Tree(load_palette(palette_name), max_nodes, seed=seed)
+    image = pygame.Surface(tree.rect.size)
+    frames = []
+    while tree.grow():
+        if recolor is not None and len(frames) == max_nodes // 2:
+            tree.change_color(load_palette(recolor))
+        image.fill(cts.background_color)
+        image.blit(tree.surface, (0, 0))
+        frames.append(pygame.surfarray.array3d(image).transpose(1, 0, 2).copy())
+    return tree, frames
+
+
+def encode(writer_class, tree, frames, palette=None):
+    output = io.BytesIO()
+    palette = tree.palette if palette is None else palette
+    with writer_class(output, tree.rect.size, palette, cts.background_color, 60) as writer:
+        for frame in frames:
+            writer.write(frame)
+    output.seek(0)
+    return output
+
+
+@pytest.mark.parametrize("palette_name", ["green", "cherry"])
+def test_apng_frames_match_growth(palette_name):
+    Image = pytest.importorskip("PIL.Image")
+    tree, frames = grow_frames(palette_name, seed=3)
+    image = Image.open(encode(animation.ApngWriter, tree, frames))
+    # Identical consecutive frames are merged, so compare against the distinct frames
+    distinct = [frame for i, frame in enumerate(frames) if i == 0 or not np.array_equal(frame, frames[i - 1])]
+    assert image.n_frames == len(distinct)
+    for i, expected in enumerate(distinct):
+        image.seek(i)
+        np.testing.assert_array_equal(np.array(image.convert("RGB")), expected)
+
+
+def test_gif_frames_match_growth():
+    Image = pytest.importorskip("PIL.Image")
+    tree, frames = grow_frames("autumn", seed=5)
+    image = Image.open(encode(animation.GifWriter, tree, frames))
+    # GIF merges frames shorter than its minimum frame time, but every frame it keeps is exact
+    sources = {frame.tobytes() for frame in frames}
+    for i in range(image.n_frames):
+        image.seek(i)
+        assert np.array(image.convert("RGB")).tobytes() in sources
+    np.testing.assert_array_equal(np.array(image.convert("RGB")), frames[-1])
+
+
+@pytest.mark.parametrize("writer_class", [animation.ApngWriter, animation.GifWriter])
+def test_frames_drawn_with_several_palettes_are_exact(writer_class):
+    Image = pytest.importorskip("PIL.Image")
+    tree, frames = grow_frames("green", seed=7, recolor="cherry")
+    palettes = [load_palette("green"), load_palette("cherry")]
+    image = Image.open(encode(writer_class, tree, frames, palettes))
+    sources = {frame.tobytes() for frame in frames}
+    for i in range(image.n_frames):
+        image.seek(i)
+        assert np.array(image.convert("RGB")).tobytes() in sources
+    np.testing.assert_array_equal(np.array(image.convert("RGB")), frames[-1])
+
+
+def test_writer_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        animation.AnimationWriter(io.BytesIO(), (4, 4), load_palette("green"), cts.background_color)
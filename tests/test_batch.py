@@ -0,0 +1,80 @@
+"""
+Regression tests for batched post-processing: batch.render_trees must match Tree.render()
+pixel for pixel.
+"""
+
+import numpy as np
+import pygame
+import pytest
+
+import batch
+import constants as cts
+from palette import load_palette
+from tree import Tree
+
+PALETTES = ["green", "autumn", "cherry", "custom0", "custom1", "custom2"]
+
+
+def image(surface):
+    return pygame.image.tobytes(surface, "RGBA")
+
+
+def make_trees(count, max_nodes):
+    trees = []
+    for seed in range(count):
+        tree = Tree(load_palette(PALETTES[seed % len(PALETTES)]), max_nodes[seed % len(max_nodes)], seed=seed)
+        tree.simulate()
+        trees.append(tree)
+    return trees
+
+
+def test_batch_matches_render():
+    sizes = [1, 2, 5, 12, 30]
+    expected = [image(tree.render()) for tree in make_trees(30, sizes)]
+    rendered = [image(surface) for surface in batch.render_trees(make_trees(30, sizes), batch_size=7)]
+    assert rendered == expected
+
+
+def test_batch_matches_render_while_growing():
+    palette = load_palette("green")
+    single = [Tree(palette, 25, seed=seed) for seed in range(4)]
+    batched = [Tree(palette, 25, seed=seed) for seed in range(4)]
+    for _ in range(40):
+        for tree in single + batched:
+            tree.step()
+        expected = [image(tree.render()) for tree in single]
+        assert [image(surface) for surface in batch.render_trees(batched)] == expected
+        assert not any(tree.dirty for tree in batched)
+
+
+def test_translucent_blit_matches_pygame():
+    rng = np.random.default_rng(0)
+    source = rng.integers(0, 2 ** 32, (64, 64), dtype=np.uint32)
+    dest = rng.integers(0, 2 ** 32, (64, 64), dtype=np.uint32)
+    source[:8] &= 0x00FFFFFF  # Transparent rows
+    dest[8:16] &= 0x00FFFFFF
+    source[16:24] |= 0xFF000000  # Opaque rows
+
+    surfaces = []
+    for pixels in (source, dest):
+        surface = pygame.Surface((64, 64), pygame.SRCALPHA)
+        assert surface.get_shifts() == batch.ARGB_SHIFTS
+        pygame.surfarray.pixels2d(surface)[...] = pixels.T
+        surfaces.append(surface)
+    surfaces[1].blit(surfaces[0], (0, 0))
+    np.testing.assert_array_equal(batch.blit(source, dest), pygame.surfarray.array2d(surfaces[1]).T.astype(np.uint32))
+
+
+@pytest.mark.parametrize("source, target", [(400, 100), (600, 150), (100, 400), (600, 400), (37, 91)])
+def test_scale_indices_match_pygame(source, target):
+    surface = pygame.Surface((source, 1), pygame.SRCALPHA)
+    pygame.surfarray.pixels2d(surface)[:, 0] = np.arange(source, dtype=np.uint32) | 0xFF000000
+    scaled = pygame.transform.scale(surface, (target, 1))
+    picked = pygame.surfarray.array2d(scaled)[:, 0].astype(np.uint32) & 0xFFFFFF
+    np.testing.assert_array_equal(picked, batch.scale_indices(source, target))
+
+
+def test_render_pngs():
+    trees = make_trees(2, [10])
+    for data in batch.render_pngs(trees, background=cts.background_color):
+        assert data.startswith(b"\x89PNG")
@@ -0,0 +1,70 @@
+"""
+Regression tests for the on-disk render cache: size accounting and least-recently-used
+eviction.
+"""
+
+import os
+
+import pytest
+
+import cache
+from palette import load_palette
+
+
+def put_aged(render_cache, key, data, age):
+    """
+    Store an entry and backdate its modification time, so eviction order does not depend on
+    the file system's timestamp resolution.
+    """
+    path = render_cache.put(key, ".png", data)
+    os.utime(path, (age, age))
+    return path
+
+
+def test_size_counts_each_entry_once(tmp_path):
+    render_cache = cache.RenderCache(str(tmp_path))
+    render_cache.put("aa01", ".png", b"x" * 1000)
+    assert render_cache.size() == 1000
+    render_cache.put("ab02", ".png", b"x" * 1000)
+    assert render_cache.size() == 2000
+    render_cache.put("aa01", ".png", b"x" * 400)  # Replacing an entry only counts the change
+    assert render_cache.size() == 1400
+    assert cache.RenderCache(str(tmp_path)).size() == 1400
+
+
+def test_size_skips_temporary_files(tmp_path):
+    render_cache = cache.RenderCache(str(tmp_path))
+    render_cache.put("aa01", ".png", b"x" * 1000)
+    with open(os.path.join(str(tmp_path), "aa", "partial.tmp"), "wb") as file:
+        file.write(b"x" * 500)
+    assert cache.RenderCache(str(tmp_path)).size() == 1000
+
+
+def test_eviction_removes_least_recently_used_down_to_low_water(tmp_path):
+    render_cache = cache.RenderCache(str(tmp_path), max_bytes=3500, low_water=0.6)
+    paths = {key: put_aged(render_cache, key, b"x" * 1000, age) for key, age in (("aa01", 1), ("ab02", 2), ("ac03", 3))}
+    assert render_cache.get("aa01", ".png") == b"x" * 1000  # Reading refreshes aa01
+    render_cache.put("ad04", ".png", b"x" * 1000)
+
+    # 4000 bytes is over the cap: the two oldest entries go, leaving 2000 (under 0.6 * 3500)
+    assert not os.path.exists(paths["ab02"])
+    assert not os.path.exists(paths["ac03"])
+    assert render_cache.get("aa01", ".png") is not None
+    assert render_cache.get("ad04", ".png") is not None
+    assert render_cache.size() == 2000
+
+
+def test_eviction_leaves_caches_under_the_cap_alone(tmp_path):
+    render_cache = cache.RenderCache(str(tmp_path), max_bytes=3000)
+    for key, age in (("aa01", 1), ("ab02", 2), ("ac03", 3)):
+        put_aged(render_cache, key, b"x" * 1000, age)
+    render_cache.evict()
+    assert render_cache.size() == 3000
+    assert all(render_cache.get(key, ".png") is not None for key in ("aa01", "ab02", "ac03"))
+
+
+def test_cache_key_needs_a_seed():
+    with pytest.raises(ValueError):
+        cache.cache_key(None, load_palette("green"), 10)
+    assert cache.cache_key(1, load_palette("green"), 10) == cache.cache_key(1, load_palette("green"), 10)
+    assert cache.cache_key(1, load_palette("green"), 10) != cache.cache_key(2, load_palette("green"), 10)
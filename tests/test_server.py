@@ -0,0 +1,79 @@
+"""
+Regression tests for the render service: request validation, and batches in which one
+request fails without taking the others down with it.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import server
+from palette import load_palette
+
+
+def request(**fields):
+    return json.dumps({"seed": 1, "max_nodes": 5, **fields}).encode()
+
+
+def custom_palette(**overrides):
+    colors = {name: list(color) for name, color in load_palette("green").items()}
+    colors.update(overrides)
+    return colors
+
+
+def good_colors():
+    return server.parse_request(request(palette=custom_palette()))[1]
+
+
+@pytest.mark.parametrize("color", [[1, 2], [1, 2, 3, 4, 5], [0, 0, 256], [-1, 0, 0], "red", [1, "x", 3]])
+def test_parse_request_rejects_bad_palette_colors(color):
+    with pytest.raises(server.RequestError):
+        server.parse_request(request(palette=custom_palette(trunk0=color)))
+
+
+@pytest.mark.parametrize("background", [[1, 2], [0, 0, 300], "red", [1, None, 3]])
+def test_parse_request_rejects_bad_backgrounds(background):
+    with pytest.raises(server.RequestError):
+        server.parse_request(request(background=background))
+
+
+def test_parse_request_normalizes_custom_palettes():
+    seed, palette, max_nodes, output_format, background = server.parse_request(
+        request(palette=custom_palette(trunk0=[1, 2, 3, 255]), format="gif", background=None)
+    )
+    assert (seed, max_nodes, output_format, background) == (1, 5, "gif", None)
+    assert dict(palette)["trunk0"] == (1, 2, 3, 255)
+    assert list(palette) == sorted(palette)
+
+
+def test_render_batch_fails_requests_individually(monkeypatch):
+    monkeypatch.setattr(server, "_palettes", {"green": load_palette("green")})
+    good = server.parse_request(request(format="gif"))
+    unknown = server.parse_request(request(palette="missing"))
+    palette = tuple((name, (1, 2) if name == "trunk0" else color) for name, color in good_colors())
+    malformed = (1, palette, 5, "gif", (0, 0, 0))  # Skips parse_request's checks
+
+    results = server.render_batch([good, unknown, malformed, good])
+    assert [status for status, _ in results] == ["ok", "invalid", "error", "ok"]
+    assert results[0][1].startswith(b"GIF89a")
+    assert results[0][1] == results[3][1]
+
+
+def test_service_answers_each_request_of_a_batch():
+    async def run():
+        service = server.RenderService(workers=1, batch_window=0.05)
+        await service.start()
+        try:
+            return await asyncio.gather(
+                service._respond("POST", "/render", request()),
+                service._respond("POST", "/render", request(palette="missing")),
+                service._respond("POST", "/render", request(palette=custom_palette(trunk0=[1, 2]))),
+            )
+        finally:
+            await service.close()
+
+    (ok, content_type, image, _), (missing, *_), (bad, *_) = asyncio.run(run())
+    assert (ok, content_type) == ("200 OK", "image/png")
+    assert image.startswith(b"\x89PNG")
+    assert missing == bad == "400 Bad Request"
@@ -0,0 +1,77 @@
+"""
+Regression tests for copy-on-write Tree snapshots.
+"""
+
+import pygame
+import pytest
+
+import node as nd
+from palette import load_palette
+from tree import Tree
+
+
+def image(tree):
+    return pygame.image.tobytes(tree.render(), "RGBA")
+
+
+def nodes(node):
+    return [] if node is None else [node] + nodes(node.left) + nodes(node.right)
+
+
+def assert_indexed(tree):
+    """
+    Check the incrementally maintained subtree sizes and leaf-bearing set against a recount.
+    """
+    for node in nodes(tree.root):
+        assert node.size == nd.count(node)
+    threshold = tree.config.children_for_leaves
+    assert tree.leaf_nodes == {node for node in nodes(tree.root) if node.size < threshold}
+
+
+@pytest.mark.parametrize("fork_at", [0, 10, 60])
+def test_snapshot_grows_like_an_unforked_tree(fork_at):
+    palette = load_palette("green")
+    tree = Tree(palette, 30, seed=9)
+    tree.simulate(fork_at)
+    fork = tree.snapshot()
+    reference = Tree(palette, 30, seed=9)
+    reference.simulate()
+
+    fork.simulate()
+    tree.simulate()
+    assert image(fork) == image(reference)
+    assert image(tree) == image(reference)
+    assert_indexed(fork)
+    assert_indexed(tree)
+
+
+def test_snapshot_changes_leave_the_original_alone():
+    tree = Tree(load_palette("green"), 30, seed=4)
+    tree.simulate(40)
+    before = image(tree)
+
+    fork = tree.snapshot()
+    fork.rng.seed(123)
+    fork.simulate()
+    fork.change_color(load_palette("cherry"))
+    fork.render()
+    assert image(tree) == before
+    assert_indexed(tree)
+
+    # And the other way round: growing the original does not touch the fork
+    fork_image = image(fork)
+    tree.simulate()
+    tree.change_color(load_palette("autumn"))
+    tree.render()
+    assert image(fork) == fork_image
+
+
+def test_snapshot_shares_structure():
+    tree = Tree(load_palette("green"), 30, seed=1)
+    tree.simulate(60)
+    fork = tree.snapshot()
+    fork.step()
+    shared = {id(node) for node in nodes(tree.root)} & {id(node) for node in nodes(fork.root)}
+    assert shared  # Only the mutated paths were copied
+    leaves = {id(node.leaves) for node in nodes(tree.root)}
+    assert all(id(node.leaves) in leaves for node in nodes(fork.root) if node.size > 1)
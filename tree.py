@@ -4,10 +4,17 @@ Tree Module
 This module defines the Tree class and related utility functions for generating procedural trees.
 """
 
-import pygame
-from typing import Dict, Tuple
+from __future__ import annotations
+
+import copy
+import random
+from typing import Dict, List, Optional, Set, Tuple
 import node as nd
 import constants as cts
+from config import DEFAULT_CONFIG, TreeConfig
+from lazy import lazy_import
+
+pygame = lazy_import("pygame")
 
 
 class Tree:
@@ -17,70 +24,267 @@ class Tree:
     Attributes:
         palette (Dict[str, Tuple[int, int, int]]): A dictionary of colors used for the tree.
         max_nodes (int): The maximum number of nodes allowed in the tree.
+        config (TreeConfig): The generation parameters of the tree.
+        rng (random.Random): The random number generator used for growth.
         age (int): The current age of the tree (used for growth).
-        rect (pygame.Rect): The bounding rectangle for the tree's surface.
-        branches (pygame.Surface): Surface for drawing tree branches.
-        leaves (pygame.Surface): Surface for drawing tree leaves.
-        surface (pygame.Surface): Final composite surface for the tree.
+        rect (pygame.Rect): The bounding rectangle for the tree's surface (created on first use,
+            so simulation-only trees never load pygame).
+        branches (Optional[pygame.Surface]): Surface for drawing tree branches.
+        leaves (Optional[pygame.Surface]): Surface for drawing tree leaves.
+        surface (Optional[pygame.Surface]): Final composite surface for the tree. The surfaces are
+            created by the first render, so simulation-only trees never allocate them.
         root (Node): The root node of the tree.
+        leaf_nodes (Set[Node]): The nodes that carry leaves, updated as subtree sizes change.
+        dirty (bool): True if the tree changed since its surfaces were last rendered.
     """
 
-    def __init__(self, palette: Dict[str, Tuple[int, int, int]], max_nodes: int) -> None:
+    def __init__(
+        self,
+        palette: Dict[str, Tuple[int, int, int]],
+        max_nodes: int,
+        config: Optional[TreeConfig] = None,
+        seed: Optional[int] = None,
+    ) -> None:
         """
         Initialize a new Tree instance.
 
         Args:
             palette (Dict[str, Tuple[int, int, int]]): A dictionary of colors for the tree.
             max_nodes (int): The maximum number of nodes in the tree.
+            config (Optional[TreeConfig]): The generation parameters (defaults to DEFAULT_CONFIG).
+            seed (Optional[int]): Seed for a private random number generator. If None, the tree
+                draws from the global random module.
         """
         self.palette = palette
         self.max_nodes = max_nodes
+        self.config = config if config is not None else DEFAULT_CONFIG
+        self.rng = random.Random(seed) if seed is not None else random
         self.age = 0
-        self.rect = pygame.Rect(0, 0, cts.tree_surface_width, cts.tree_surface_height)
-        self.branches = pygame.Surface(self.rect.size, pygame.SRCALPHA)
-        self.leaves = pygame.Surface(self.rect.size, pygame.SRCALPHA)
-        self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        self._rect: Optional[pygame.Rect] = None
+        self.branches: Optional[pygame.Surface] = None
+        self.leaves: Optional[pygame.Surface] = None
+        self.surface: Optional[pygame.Surface] = None
         self.root = nd.Node(
-            self.age, cts.start_branch_len, cts.start_branch_angle, self.palette
+            self.age,
+            self.config.start_branch_len,
+            self.config.start_branch_angle,
+            self.palette,
+            self.config,
+            self.rng,
         )
+        self._owner = object()
+        self.root.owner = self._owner
+        self.leaf_nodes: Set[nd.Node] = set()
+        self._leaf_nodes_owned = True
+        self._leaf_rects: Dict[nd.Node, pygame.Rect] = {}
+        self.reindex()
+
+    @property
+    def rect(self) -> pygame.Rect:
+        """
+        The bounding rectangle for the tree's surface.
+        """
+        if self._rect is None:
+            self._rect = pygame.Rect(0, 0, cts.tree_surface_width, cts.tree_surface_height)
+        return self._rect
 
     def grow(self) -> bool:
         """
-        Grow the tree by adding new nodes and bending existing branches.
+        Grow the tree by one step and render it.
 
         Returns:
             bool: True if the tree grew, False if it has reached its maximum size.
         """
-        if nd.count(self.root) < self.max_nodes:
+        grew = self.step()
+        self.render()
+        return grew
+
+    def step(self) -> bool:
+        """
+        Grow the tree by adding new nodes and bending existing branches, without rendering.
+
+        Returns:
+            bool: True if the tree grew, False if it has reached its maximum size.
+        """
+        if self.root.size < self.max_nodes:
             self.age += 1
-            grow_node = nd.youngest(self.root)[1]
+            path = self._writable(nd.path_to(self.root, nd.youngest(self.root)[1]))
+            grow_node = path[-1]
+            children = (grow_node.left, grow_node.right)
             grow_node.grow(self.age)
+            if (grow_node.left, grow_node.right) != children:
+                new_node = grow_node.right if grow_node.left is children[0] else grow_node.left
+                new_node.owner = self._owner
+                self._add_to_sizes(path, new_node)
 
-            bend_node = nd.random_child(self.root)
+            bend_node = nd.random_child(self.root, self.rng)
             if bend_node is not None:
-                if nd.count(bend_node.left) < nd.count(bend_node.right):
-                    bend_node.left.bend(1)
+                if bend_node.left.size < bend_node.right.size:
+                    self._writable_branch(bend_node.left).bend(1)
                 else:
-                    bend_node.right.bend(-1)
+                    self._writable_branch(bend_node.right).bend(-1)
 
-            self.update_surfaces()
+            self.dirty = True
             return True
 
-        self.update_surfaces()
         return False
 
+    def _add_to_sizes(self, path: List[nd.Node], new_node: nd.Node) -> None:
+        """
+        Account for a node added below the end of path, updating subtree sizes and the set of
+        leaf-bearing nodes. Only nodes on the path can change, so this costs O(depth).
+        """
+        threshold = self.config.children_for_leaves
+        self._own_leaf_nodes()
+        for node in path:
+            node.size += 1
+            if node.size == threshold:
+                self.leaf_nodes.discard(node)
+        if new_node.size < threshold:
+            self.leaf_nodes.add(new_node)
+
+    def snapshot(self) -> "Tree":
+        """
+        Take an O(1) snapshot of the tree that can be grown independently.
+
+        Both trees keep sharing every node; a later mutation of either one copies only the path
+        from the root to the changed node, and leaf data and surfaces stay shared. The snapshot
+        gets its own copy of the random number generator state (unless the tree draws from the
+        global random module) and renders from scratch the first time it is drawn.
+
+        Returns:
+            Tree: The snapshot.
+        """
+        clone = copy.copy(self)
+        self._owner = object()
+        clone._owner = object()
+        self._leaf_nodes_owned = clone._leaf_nodes_owned = False
+        if isinstance(self.rng, random.Random):
+            clone.rng = random.Random()
+            clone.rng.setstate(self.rng.getstate())
+        clone.branches = clone.leaves = clone.surface = None
+        clone._leaf_rects = {}
+        clone.dirty = True
+        return clone
+
+    def _own_leaf_nodes(self) -> None:
+        """
+        Copy the leaf-bearing set before its first change if it is shared with a snapshot.
+        """
+        if not self._leaf_nodes_owned:
+            self.leaf_nodes = set(self.leaf_nodes)
+            self._leaf_nodes_owned = True
+
+    def _writable(self, path: List[nd.Node]) -> List[nd.Node]:
+        """
+        Make every node on a path from the root safe to modify, copying the ones that may be
+        shared with a snapshot and linking the copies in place of the originals.
+
+        Args:
+            path (List[nd.Node]): Nodes from the root down.
+
+        Returns:
+            List[nd.Node]: The same path made of nodes owned by this tree.
+        """
+        writable = []
+        parent = None
+        for node in path:
+            if node.owner is not self._owner:
+                node = self._replace(parent, node)
+            writable.append(node)
+            parent = node
+        return writable
+
+    def _writable_branch(self, node: nd.Node) -> nd.Node:
+        """
+        Make a node and its direct children safe to modify (bending changes all three).
+
+        Args:
+            node (nd.Node): The node to bend.
+
+        Returns:
+            nd.Node: The writable node.
+        """
+        node = self._writable(nd.path_to(self.root, node))[-1]
+        for child in (node.left, node.right):
+            if child is not None and child.owner is not self._owner:
+                self._replace(node, child)
+        return node
+
+    def _replace(self, parent: Optional[nd.Node], node: nd.Node) -> nd.Node:
+        """
+        Link an owned copy of node in its place under parent (or as the root).
+        """
+        clone = node.clone()
+        clone.owner = self._owner
+        clone.rng = self.rng
+        if parent is None:
+            self.root = clone
+        elif parent.left is node:
+            parent.left = clone
+        else:
+            parent.right = clone
+        if node in self.leaf_nodes:
+            self._own_leaf_nodes()
+            self.leaf_nodes.discard(node)
+            self.leaf_nodes.add(clone)
+        return clone
+
+    def reindex(self) -> None:
+        """
+        Recompute subtree sizes and leaf-bearing nodes from scratch. Call this after editing
+        the nodes of the tree directly rather than through step().
+        """
+        threshold = self.config.children_for_leaves
+        self.leaf_nodes = set()
+        self._leaf_nodes_owned = True
+
+        def visit(node: Optional[nd.Node]) -> int:
+            if node is None:
+                return 0
+            node.size = 1 + visit(node.left) + visit(node.right)
+            if node.size < threshold:
+                self.leaf_nodes.add(node)
+            return node.size
+
+        visit(self.root)
+        self.dirty = True
+
+    def simulate(self, steps: Optional[int] = None) -> int:
+        """
+        Run growth steps without rendering.
+
+        Args:
+            steps (Optional[int]): The number of steps to run, or None to grow to completion.
+
+        Returns:
+            int: The number of steps in which the tree grew.
+        """
+        grown = 0
+        while steps is None or grown < steps:
+            if not self.step():
+                break
+            grown += 1
+        return grown
+
+    def render(self) -> pygame.Surface:
+        """
+        Render the tree's surfaces if anything changed since the last render.
+
+        Returns:
+            pygame.Surface: The up-to-date composite surface.
+        """
+        if self.dirty:
+            self.update_surfaces()
+        return self.surface
+
     def update_surfaces(self) -> None:
         """
         Update the tree's surfaces by redrawing branches, leaves, and shadows.
         """
-        # Clear surfaces and ensure transparency
+        self.dirty = False
+        self.update_layers()
         self.surface.fill((0, 0, 0, 0))
-        self.branches.fill((0, 0, 0, 0))
-        self.leaves.fill((0, 0, 0, 0))
-
-        # Draw branches and leaves onto respective surfaces
-        nd.draw_branches(self.root, cts.tree_base_pos, self.branches)
-        nd.draw_leaves(self.root, cts.tree_base_pos, self.leaves)
         leaves = pixellate_and_outline(self.leaves, self.palette["leaves_outline"])
 
         # Draw shadow, then branches, then leaves to the final surface
@@ -94,15 +298,70 @@ class Tree:
         )
         self.surface.blit(leaves, (0, 0))
 
+    def update_layers(self) -> None:
+        """
+        Redraw the raw branch and leaf layers, before any pixelation, outlines or shadow.
+        """
+        if self.surface is None:
+            self.branches = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            self.leaves = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        self.branches.fill((0, 0, 0, 0))
+        nd.draw_branches(self.root, cts.tree_base_pos, self.branches)
+        self.update_leaves()
+
+    def update_leaves(self) -> None:
+        """
+        Bring the persistent leaf layer up to date. Only the areas of leaves that were added,
+        removed or moved since the last update are cleared and redrawn, so the cost follows
+        the number of changes rather than the amount of foliage.
+        """
+        placed = nd.leaf_positions(self.root, cts.tree_base_pos, self.leaf_nodes, [])
+        size = (cts.leaf_surface_width, cts.leaf_surface_height)
+        rects = {node: pygame.Rect(pos, size) for node, pos in placed}
+
+        # Overlapping changes are merged so every area is cleared and redrawn only once
+        areas: List[pygame.Rect] = []
+        for node in self._leaf_rects.keys() | rects.keys():
+            old, new = self._leaf_rects.get(node), rects.get(node)
+            if old == new:
+                continue
+            area = old.union(new) if old is not None and new is not None else (old or new).copy()
+            index = area.collidelist(areas)
+            while index != -1:
+                area.union_ip(areas.pop(index))
+                index = area.collidelist(areas)
+            areas.append(area)
+        self._leaf_rects = rects
+
+        # Leaves overlap, so each changed area is redrawn from every leaf touching it, in order
+        for area in areas:
+            self.leaves.set_clip(area)
+            self.leaves.fill((0, 0, 0, 0))
+            for node, pos in placed:
+                if area.colliderect(rects[node]):
+                    self.leaves.blit(node.leaves.surface, pos)
+        self.leaves.set_clip(None)
+
+    def invalidate_leaves(self) -> None:
+        """
+        Force the next render to redraw the whole leaf layer.
+        """
+        if self.leaves is not None:
+            self.leaves.fill((0, 0, 0, 0))
+        self._leaf_rects = {}
+        self.dirty = True
+
     def draw(self, surface: pygame.Surface, pos: Tuple[int, int]) -> None:
         """
-        Draw the tree onto a given surface at a specified position.
+        Draw the tree onto a given surface at a specified position, rendering it first if it
+        changed.
 
         Args:
             surface (pygame.Surface): The target surface to draw on.
             pos (Tuple[int, int]): The position (x, y) to draw the tree.
         """
-        surface.blit(self.surface, pos)
+        surface.blit(self.render(), pos)
 
     def change_color(self, new_palette: Dict[str, Tuple[int, int, int]]) -> None:
         """
@@ -111,7 +370,27 @@ class Tree:
         Args:
             new_palette (Dict[str, Tuple[int, int, int]]): A new dictionary of colors for the tree.
         """
-        nd.change_palette(self.root, new_palette)
+        self.palette = new_palette
+        self.root = self._recolor(self.root, new_palette)
+        self.reindex()
+        self.invalidate_leaves()
+
+    def _recolor(self, node: Optional[nd.Node], new_palette: Dict[str, Tuple[int, int, int]]) -> Optional[nd.Node]:
+        """
+        Recolor a subtree, copying nodes shared with snapshots and giving every node new
+        leaves with the same positions, so snapshots keep their own colors.
+        """
+        if node is None:
+            return None
+        if node.owner is not self._owner:
+            node = node.clone()
+            node.owner = self._owner
+            node.rng = self.rng
+        node.palette = new_palette
+        node.leaves = node.leaves.recolored(new_palette)
+        node.left = self._recolor(node.left, new_palette)
+        node.right = self._recolor(node.right, new_palette)
+        return node
 
 
 def pixellate(surface: pygame.Surface) -> pygame.Surface: